@@ -1,4 +1,4 @@
-import bpy, re, time, math, numpy
+import bpy, re, time, math, numpy, os, sys, json, shutil, tempfile, subprocess
 from bpy.props import *
 from mathutils import *
 from .common import *
@@ -196,21 +196,8 @@ def transfer_uv(objs, mat, entity, uv_map):
         # Bake again!
         bpy.ops.object.bake()
 
-        # Set tile pixels
-        for tilenum in tilenums:
-
-            # Swap tile
-            if tilenum != 1001:
-                UDIM.swap_tile(temp_image, 1001, tilenum)
-                UDIM.swap_tile(temp_image1, 1001, tilenum)
-
-            # Copy the result to original temp image
-            copy_image_channel_pixels(temp_image1, temp_image, 0, 3)
-
-            # Swap tile again to recover
-            if tilenum != 1001:
-                UDIM.swap_tile(temp_image, 1001, tilenum)
-                UDIM.swap_tile(temp_image1, 1001, tilenum)
+        # Copy the result to original temp image
+        UDIM.copy_tiles_channel_pixels(temp_image1, temp_image, tilenums, 0, 3)
 
         # Remove temp image 1
         bpy.data.images.remove(temp_image1)
@@ -947,6 +934,200 @@ class YDeleteBakedChannelImages(bpy.types.Operator):
 
         return {'FINISHED'}
 
+# Script run by background bake worker, job file path is passed after '--'
+BAKE_WORKER_SCRIPT = """
+import bpy, sys, json, importlib, addon_utils
+
+job = json.load(open(sys.argv[sys.argv.index('--') + 1]))
+addon_utils.enable(job['package'], default_set=False)
+bake_common = importlib.import_module(job['package'] + '.bake_common')
+
+obj = bpy.data.objects[job['object']]
+mat = bpy.data.materials[job['material']]
+bpy.context.view_layer.objects.active = obj
+obj.active_material_index = [i for i, slot in enumerate(obj.material_slots) if slot.material == mat][0]
+mat.node_tree.nodes.active = mat.node_tree.nodes[job['node']]
+
+bake_common.set_bake_job('SAVE', job['dir'])
+bpy.ops.node.y_bake_channels('EXEC_DEFAULT', **job['props'])
+"""
+
+def start_background_bake_channels(op, context, node):
+    yp = node.node_tree.yp
+    obj = context.object
+    mat = obj.active_material
+
+    if not is_greater_than_283():
+        return 'Background bake needs Blender 2.83 or above!'
+
+    # Worker only sees what is saved on the blend file
+    if any(img.is_dirty for img in bpy.data.images):
+        return 'Please save or pack modified images before baking in background!'
+
+    objs = get_all_objects_with_same_materials(mat)
+    if len(UDIM.get_tile_numbers(objs, op.uv_map)) > 1:
+        return 'Background bake does not support UDIM yet!'
+
+    channel_names = [ch.name for ch in yp.channels if is_any_layer_using_channel(ch, node)]
+    if op.only_channels != '':
+        only_channels = op.only_channels.split(';')
+        channel_names = [name for name in channel_names if name in only_channels]
+    if not channel_names:
+        return 'There is no channel to bake!'
+
+    directory = tempfile.mkdtemp(prefix='ypaint_bake_')
+    blend_path = os.path.join(directory, 'bake.blend')
+    script_path = os.path.join(directory, 'worker.py')
+
+    bpy.ops.wm.save_as_mainfile(filepath=blend_path, copy=True, check_existing=False)
+    with open(script_path, 'w') as f:
+        f.write(BAKE_WORKER_SCRIPT)
+
+    props = {}
+    for prop in ['width', 'height', 'uv_map', 'samples', 'margin', 'aa_level', 'fxaa', 'force_bake_all_polygons', 'bake_device', 'skip_unchanged']:
+        props[prop] = getattr(op, prop)
+    props['use_background_bake'] = False
+
+    job = {
+        'dir' : directory,
+        'object' : obj.name,
+        'material' : mat.name,
+        'node' : node.name,
+        'props' : props,
+        'workers' : [],
+        'time' : time.time(),
+        'failed' : False,
+    }
+
+    # Spread channels to workers
+    num_workers = min(op.background_workers, len(channel_names))
+    for i in range(num_workers):
+        channels = channel_names[i::num_workers]
+
+        worker_props = props.copy()
+        worker_props['only_channels'] = ';'.join(channels)
+
+        job_path = os.path.join(directory, 'job_' + str(i) + '.json')
+        with open(job_path, 'w') as f:
+            json.dump({
+                'package' : __package__,
+                'object' : obj.name,
+                'material' : mat.name,
+                'node' : node.name,
+                'props' : worker_props,
+                'dir' : directory,
+                }, f)
+
+        log = open(os.path.join(directory, 'worker_' + str(i) + '.log'), 'w')
+        proc = subprocess.Popen([bpy.app.binary_path, '-b', blend_path, '--python-exit-code', '1', 
+            '--python', script_path, '--', job_path], stdout=log, stderr=subprocess.STDOUT)
+
+        job['workers'].append({'proc' : proc, 'log' : log, 'channels' : channels, 'applied' : False})
+        print('INFO: Background bake worker', i, 'is started for channels:', ', '.join(channels))
+
+    bpy.app.timers.register(lambda: check_background_bake_channels(job), first_interval=1.0)
+
+    return ''
+
+def report_background_bake_errors(errors):
+    for error in errors:
+        print('ERROR:', error)
+
+    # There's no operator to report from timer, so show the errors on a popup
+    wm = bpy.context.window_manager
+    if not bpy.app.background and len(wm.windows) > 0:
+        def draw(self, context):
+            for error in errors:
+                self.layout.label(text=error)
+        wm.popup_menu(draw, title='Background Bake Error', icon='ERROR')
+
+def apply_background_bake_channels(job, channels):
+    obj = bpy.data.objects.get(job['object'])
+    mat = bpy.data.materials.get(job['material'])
+    node = mat.node_tree.nodes.get(job['node']) if mat and mat.node_tree else None
+    if not obj or not node: 
+        return ['Background bake target is no longer available!']
+
+    # Only apply channels with complete results, worker can also skip unchanged channels
+    yp = node.node_tree.yp
+    errors = []
+    valid_channels = []
+    for name in channels:
+        ch = yp.channels.get(name)
+        manifest = read_bake_job_manifest(job['dir'], ch) if ch else None
+        if not manifest:
+            errors.append('Background bake result of ' + name + ' channel is not found!')
+        elif manifest['skipped']:
+            continue
+        elif not manifest['files'] or not all(os.path.isfile(os.path.join(job['dir'], f)) for f in manifest['files']):
+            errors.append('Background bake result of ' + name + ' channel is incomplete!')
+        else: valid_channels.append(name)
+
+    if not valid_channels: return errors
+
+    # Make baked node and object active so the operator will use them
+    ori_active = bpy.context.view_layer.objects.active
+    bpy.context.view_layer.objects.active = obj
+    slot_ids = [i for i, slot in enumerate(obj.material_slots) if slot.material == mat]
+    if slot_ids: obj.active_material_index = slot_ids[0]
+    mat.node_tree.nodes.active = node
+
+    props = job['props'].copy()
+    props['only_channels'] = ';'.join(valid_channels)
+
+    # Worker already decided which channels need to be baked
+    props['skip_unchanged'] = False
+
+    wm = bpy.context.window_manager
+    window = wm.windows[0] if len(wm.windows) > 0 else None
+
+    set_bake_job('LOAD', job['dir'])
+    try:
+        if is_greater_than_320():
+            with bpy.context.temp_override(window=window, object=obj, active_object=obj):
+                bpy.ops.node.y_bake_channels('EXEC_DEFAULT', **props)
+        else:
+            override = bpy.context.copy()
+            override['window'] = window
+            override['object'] = override['active_object'] = obj
+            bpy.ops.node.y_bake_channels(override, 'EXEC_DEFAULT', **props)
+        missing = get_bake_job_missing_results()
+        if missing:
+            errors.append('Background bake results are missing: ' + ', '.join(missing))
+    finally:
+        set_bake_job()
+        if ori_active: bpy.context.view_layer.objects.active = ori_active
+
+    return errors
+
+def check_background_bake_channels(job):
+    # Apply worker results as soon as each of them is finished
+    for i, worker in enumerate(job['workers']):
+        if worker['applied'] or worker['proc'].poll() == None: continue
+
+        worker['applied'] = True
+        worker['log'].close()
+
+        errors = []
+        if worker['proc'].returncode != 0:
+            errors.append('Background bake worker ' + str(i) + ' is failed, see ' + worker['log'].name)
+
+        try: errors.extend(apply_background_bake_channels(job, worker['channels']))
+        except Exception as e: errors.append('Applying background bake is failed! ' + str(e))
+
+        if errors: 
+            job['failed'] = True
+            report_background_bake_errors(errors)
+
+    if all(w['applied'] for w in job['workers']):
+        # Keep worker logs if there's any error
+        if not job['failed']:
+            shutil.rmtree(job['dir'], ignore_errors=True)
+        print('INFO: Background bake is done at', '{:0.2f}'.format(time.time() - job['time']), 'seconds!')
+        return None
+
+    return 1.0
+
 class YBakeChannels(bpy.types.Operator):
     """Bake Channels to Image(s)"""
     bl_idname = "node.y_bake_channels"
@@ -991,6 +1172,24 @@ class YBakeChannels(bpy.types.Operator):
             default='CPU'
             )
 
+    skip_unchanged : BoolProperty(
+            name='Skip Unchanged Channels',
+            description='Only bake channels with changed layers, material inputs, mesh or bake settings since the last bake',
+            default=False)
+
+    use_background_bake : BoolProperty(
+            name='Bake in Background',
+            description='Bake channels using separate Blender processes so the interface is not blocked',
+            default=False)
+
+    background_workers : IntProperty(
+            name='Background Workers',
+            description='Number of Blender processes baking channels in parallel',
+            default=2, min=1, max=16)
+
+    # Semicolon separated channel names to bake, empty means all channels
+    only_channels : StringProperty(default='')
+
     @classmethod
     def poll(cls, context):
         return get_active_ypaint_node() and context.object.type == 'MESH'
@@ -1062,6 +1261,9 @@ class YBakeChannels(bpy.types.Operator):
         col.separator()
         col.label(text='')
         col.label(text='')
+        col.label(text='')
+        col.label(text='')
+        col.label(text='Workers:')
 
         col = row.column(align=True)
 
@@ -1082,6 +1284,11 @@ class YBakeChannels(bpy.types.Operator):
         col.separator()
         col.prop(self, 'fxaa', text='Use FXAA')
         col.prop(self, 'force_bake_all_polygons')
+        col.prop(self, 'skip_unchanged')
+        col.prop(self, 'use_background_bake')
+        r = col.row()
+        r.active = self.use_background_bake
+        r.prop(self, 'background_workers', text='')
 
     def execute(self, context):
 
@@ -1102,6 +1309,14 @@ class YBakeChannels(bpy.types.Operator):
             self.report({'ERROR'}, "Please unhide render of active object!")
             return {'CANCELLED'}
 
+        # Dispatch bake to background workers
+        if self.use_background_bake and get_bake_job_mode() == None and not bpy.app.background:
+            error = start_background_bake_channels(self, context, node)
+            if error == '':
+                self.report({'INFO'}, "Baking channels in background...")
+                return {'FINISHED'}
+            self.report({'WARNING'}, error + " Baking in foreground instead.")
+
         book = remember_before_bake(yp)
 
         height_ch = get_root_height_channel(yp)
@@ -1153,6 +1368,21 @@ class YBakeChannels(bpy.types.Operator):
                             objs.append(ob)
                             meshes.append(ob.data)
 
+        # Fingerprints should be checked before multi materials setup modifies the uv
+        # Computing them is expensive, so it's only done when unchanged channels can be skipped
+        fingerprints = {}
+        settings = (self.width, self.height, self.samples, self.margin, self.aa_level, self.fxaa, 
+                self.force_bake_all_polygons, self.uv_map)
+        memo = {}
+        for ch in yp.channels:
+            # Results of background worker should use the state it was baked from
+            if get_bake_job_mode() == 'LOAD':
+                manifest = read_bake_job_manifest(get_bake_job_dir(), ch)
+                fingerprints[ch.name] = manifest['fingerprint'] if manifest else ''
+            elif self.skip_unchanged:
+                fingerprints[ch.name] = get_bake_channel_fingerprint(node, ch, objs, self.uv_map, settings, memo)
+            else: fingerprints[ch.name] = ''
+
         # Multi materials setup
         ori_mat_ids = {}
         ori_loop_locs = {}
@@ -1209,54 +1439,74 @@ class YBakeChannels(bpy.types.Operator):
         # Prepare bake settings
         prepare_bake_settings(book, objs, yp, self.samples, margin, self.uv_map, disable_problematic_modifiers=True, bake_device=self.bake_device)
 
+        # Setup nodes and tile numbers are shared by all channels
+        session = prepare_bake_channel_session(mat, self.uv_map)
+
         # Bake channels
+        baked_channels = []
         for ch in yp.channels:
             ch.no_layer_using = not is_any_layer_using_channel(ch, node)
+            if self.only_channels != '' and ch.name not in self.only_channels.split(';'): continue
             if not ch.no_layer_using:
                 #if ch.type != 'NORMAL': continue
+
+                # Skip channel if nothing has changed since the last bake
+                if self.skip_unchanged and is_baked_channel_up_to_date(tree, ch, fingerprints[ch.name], self.width, self.height):
+                    print('INFO: Channel', ch.name, 'is unchanged, skipping bake...')
+                    if get_bake_job_mode() == 'SAVE':
+                        write_bake_job_manifest(ch, fingerprints[ch.name], skipped=True)
+                    continue
+
                 use_hdr = not ch.use_clamp
-                bake_channel(self.uv_map, mat, node, ch, width, height, use_hdr=use_hdr)
+                num_missing = len(get_bake_job_missing_results())
+                bake_channel(self.uv_map, mat, node, ch, width, height, use_hdr=use_hdr, session=session)
 
-        # AA process
-        if self.aa_level > 1:
-            for ch in yp.channels:
+                if get_bake_job_mode() == 'SAVE':
+                    write_bake_job_manifest(ch, fingerprints[ch.name])
+
+                # Channel with missing background results should not be marked as up to date
+                if len(get_bake_job_missing_results()) > num_missing:
+                    continue
+
+                baked_channels.append(ch)
+
+        recover_bake_channel_session(session)
+
+        # Post process baked images (worker only need to store the raw bake results)
+        if (self.aa_level > 1 or self.fxaa) and get_bake_job_mode() != 'SAVE':
+            for ch in baked_channels:
 
                 baked = tree.nodes.get(ch.baked)
-                if baked and baked.image:
-                    resize_image(baked.image, self.width, self.height, 
-                            baked.image.colorspace_settings.name, alpha_aware=ch.enable_alpha, bake_device=self.bake_device)
+                if not baked or not baked.image: continue
+
+                images = [baked.image]
 
                 if ch.type == 'NORMAL':
 
                     baked_disp = tree.nodes.get(ch.baked_disp)
                     if baked_disp and baked_disp.image:
-                        resize_image(baked_disp.image, self.width, self.height, 
-                                baked.image.colorspace_settings.name, alpha_aware=ch.enable_alpha, bake_device=self.bake_device)
+                        images.append(baked_disp.image)
 
                     baked_normal_overlay = tree.nodes.get(ch.baked_normal_overlay)
                     if baked_normal_overlay and baked_normal_overlay.image:
-                        resize_image(baked_normal_overlay.image, self.width, self.height, 
-                                baked.image.colorspace_settings.name, alpha_aware=ch.enable_alpha, bake_device=self.bake_device)
+                        images.append(baked_normal_overlay.image)
 
-        # FXAA
-        if self.fxaa:
-            for ch in yp.channels:
-                # FXAA doesn't work with hdr image
-                if not ch.use_clamp: continue
+                colorspace = baked.image.colorspace_settings.name
 
-                baked = tree.nodes.get(ch.baked)
-                if baked and baked.image:
-                    fxaa_image(baked.image, ch.enable_alpha, bake_device=self.bake_device)
+                for image in images:
 
-                if ch.type == 'NORMAL':
+                    # AA process
+                    if self.aa_level > 1:
+                        image = resize_image(image, self.width, self.height, 
+                                colorspace, alpha_aware=ch.enable_alpha, bake_device=self.bake_device)[0]
 
-                    baked_disp = tree.nodes.get(ch.baked_disp)
-                    if baked_disp and baked_disp.image:
-                        fxaa_image(baked_disp.image, ch.enable_alpha, bake_device=self.bake_device)
+                    # FXAA doesn't work with hdr image
+                    if self.fxaa and ch.use_clamp:
+                        fxaa_image(image, ch.enable_alpha, bake_device=self.bake_device)
 
-                    baked_normal_overlay = tree.nodes.get(ch.baked_normal_overlay)
-                    if baked_normal_overlay and baked_normal_overlay.image:
-                        fxaa_image(baked_normal_overlay.image, ch.enable_alpha, bake_device=self.bake_device)
+        # Remember fingerprints of baked channels, channels baked without fingerprint will be cleared
+        for ch in baked_channels:
+            set_baked_channel_fingerprint(tree, ch, fingerprints[ch.name])
 
         # Set baked uv
         yp.baked_uv_name = self.uv_map
@@ -108,6 +108,9 @@ class YBakeInfoProps(bpy.types.PropertyGroup):
     selected_face_mode : BoolProperty(default=False)
     selected_objects : CollectionProperty(type=YBakeInfoSelectedObject)
 
+    # Fingerprint of the inputs used to bake channel, used to skip unchanged channels
+    bake_fingerprint : StringProperty(default='')
+
 def register():
     bpy.utils.register_class(YBakeInfoOtherObject)
     bpy.utils.register_class(YBakeInfoSelectedVertex)
@@ -1448,26 +1448,31 @@ class YBakeToLayer(bpy.types.Operator):
                 # Bake emit can will create alpha image
                 bpy.ops.object.bake(type='EMIT')
 
-                # Set tile pixels
-                for tilenum in tilenums:
+                if image.source == 'TILED':
+
+                    # Process all tiles in parallel
+                    def fxaa_tile_alpha(tilenum, pxs_list):
+                        image_pxs, temp_pxs = pxs_list
+
+                        # Copy alpha to RGB channel, so it can be fxaa-ed
+                        temp_pxs[..., 0] = temp_pxs[..., 3]
+                        fxaa_pixels(temp_pxs)
 
-                    # Swap tile
-                    if tilenum != 1001:
-                        UDIM.swap_tile(image, 1001, tilenum)
-                        UDIM.swap_tile(temp_img, 1001, tilenum)
+                        # Copy alpha to actual image
+                        image_pxs[..., 3] = temp_pxs[..., 0]
 
+                        return [image_pxs, None]
+
+                    UDIM.process_tiles([image, temp_img], tilenums, fxaa_tile_alpha)
+
+                else:
                     # Copy alpha to RGB channel, so it can be fxaa-ed
                     copy_image_channel_pixels(temp_img, temp_img, 3, 0)
-                    fxaa_image(temp_img, False, self.bake_device, first_tile_only=True)
+                    fxaa_image(temp_img, False, self.bake_device)
 
                     # Copy alpha to actual image
                     copy_image_channel_pixels(temp_img, image, 0, 3)
 
-                    # Swap tile again to recover
-                    if tilenum != 1001:
-                        UDIM.swap_tile(image, 1001, tilenum)
-                        UDIM.swap_tile(temp_img, 1001, tilenum)
-
                 # Remove temp image
                 bpy.data.images.remove(temp_img)
 
@@ -1499,7 +1504,9 @@ class YBakeToLayer(bpy.types.Operator):
                     else:
                         # Clearing unused image atlas segments
                         img_atlas = ImageAtlas.check_need_of_erasing_segments(yp, 'TRANSPARENT', self.width, self.height, self.hdr)
-                        if img_atlas: ImageAtlas.clear_unused_segments(img_atlas.yia)
+                        if img_atlas:
+                            num_segments, num_pixels, elapsed = ImageAtlas.clear_unused_segments(img_atlas.yia)
+                            ImageAtlas.report_cleared_segments(self, img_atlas.yia, num_segments, num_pixels, elapsed)
 
                         segment = ImageAtlas.get_set_image_atlas_segment(
                                 self.width, self.height, 'TRANSPARENT', self.hdr, yp=yp) #, ypup.image_atlas_size)
@@ -2176,7 +2183,9 @@ class YDuplicateLayerToImage(bpy.types.Operator):
                 else:
                     # Clearing unused image atlas segments
                     img_atlas = ImageAtlas.check_need_of_erasing_segments(yp, 'BLACK', self.width, self.height, self.hdr)
-                    if img_atlas: ImageAtlas.clear_unused_segments(img_atlas.yia)
+                    if img_atlas:
+                        num_segments, num_pixels, elapsed = ImageAtlas.clear_unused_segments(img_atlas.yia)
+                        ImageAtlas.report_cleared_segments(self, img_atlas.yia, num_segments, num_pixels, elapsed)
 
                     segment = ImageAtlas.get_set_image_atlas_segment(
                             self.width, self.height, 'BLACK', self.hdr, yp=yp) #, ypup.image_atlas_size)
@@ -1,35 +1,76 @@
-import bpy, time, random, numpy, re
+import bpy, time, random, numpy, re, math
 from bpy.props import *
 from .common import *
 from .subtree import *
 from . import BakeInfo, UDIM
 
-def is_tile_available(x, y, width, height, atlas):
+# Occupancy grid cache per image atlas, keyed by atlas image name
+# Each entry is [signature, cell size, boolean numpy grid]
+_atlas_occupancy_cache = {}
 
-    start_x = width * x
-    end_x = start_x + width - 1
+def get_atlas_signature(atlas):
+    atlas_img = atlas.id_data
+    return (tuple(atlas_img.size), tuple((s.tile_x, s.tile_y, s.width, s.height) for s in atlas.segments))
+
+def get_atlas_cell_size(atlas_img, sizes):
+    cell = math.gcd(atlas_img.size[0], atlas_img.size[1])
+    for size in sizes:
+        cell = math.gcd(cell, size)
+    return max(cell, 1)
+
+def mark_atlas_occupancy(grid, cell, tile_x, tile_y, width, height):
+    start_x = (width * tile_x) // cell
+    start_y = (height * tile_y) // cell
+    end_x = -(-(width * (tile_x + 1)) // cell)
+    end_y = -(-(height * (tile_y + 1)) // cell)
+    grid[start_y:end_y, start_x:end_x] = True
+
+def get_atlas_occupancy(atlas, width, height):
+    atlas_img = atlas.id_data
+    signature = get_atlas_signature(atlas)
 
-    start_y = height * y
-    end_y = start_y + height - 1
+    cache = _atlas_occupancy_cache.get(atlas_img.name)
+    if cache and cache[0] == signature and width % cache[1] == 0 and height % cache[1] == 0:
+        return cache[1], cache[2]
 
-    for segment in atlas.segments:
+    # Cell size should be able to represent every segment and the requested size
+    sizes = [width, height]
+    for s in signature[1]:
+        sizes.extend(s[2:])
+    cell = get_atlas_cell_size(atlas_img, sizes)
 
-        segment_start_x = segment.width * segment.tile_x
-        segment_end_x = segment_start_x + segment.width - 1
+    grid = numpy.zeros(shape=(atlas_img.size[1] // cell, atlas_img.size[0] // cell), dtype=bool)
+    for tile_x, tile_y, w, h in signature[1]:
+        mark_atlas_occupancy(grid, cell, tile_x, tile_y, w, h)
 
-        segment_start_y = segment.height * segment.tile_y
-        segment_end_y = segment_start_y + segment.height - 1
+    _atlas_occupancy_cache[atlas_img.name] = [signature, cell, grid]
 
-        if (
-            ((start_x >= segment_start_x and start_x <= segment_end_x) or 
-            (end_x <= segment_end_x and end_x >= segment_start_x)) 
-            and
-            ((start_y >= segment_start_y and start_y <= segment_end_y) or 
-            (end_y <= segment_end_y and end_y >= segment_start_y)) 
-            ):
-            return False
+    return cell, grid
 
-    return True
+def update_atlas_occupancy(atlas, segment):
+    atlas_img = atlas.id_data
+    cache = _atlas_occupancy_cache.get(atlas_img.name)
+    if not cache: return
+
+    if segment.width % cache[1] != 0 or segment.height % cache[1] != 0:
+        _atlas_occupancy_cache.pop(atlas_img.name)
+        return
+
+    mark_atlas_occupancy(cache[2], cache[1], segment.tile_x, segment.tile_y, segment.width, segment.height)
+    cache[0] = get_atlas_signature(atlas)
+
+def clear_atlas_occupancy_cache(atlas=None):
+    if atlas: _atlas_occupancy_cache.pop(atlas.id_data.name, None)
+    else: _atlas_occupancy_cache.clear()
+
+def is_tile_available(x, y, width, height, atlas):
+
+    cell, grid = get_atlas_occupancy(atlas, width, height)
+
+    start_x = (width * x) // cell
+    start_y = (height * y) // cell
+
+    return not grid[start_y:start_y + height // cell, start_x:start_x + width // cell].any()
 
 def get_available_tile(width, height, atlas):
     atlas_img = atlas.id_data
@@ -37,12 +78,25 @@ def get_available_tile(width, height, atlas):
     num_x = int(atlas_img.size[0] / width)
     num_y = int(atlas_img.size[1] / height)
 
-    for y in range(num_y):
-        for x in range(num_x):
-            if is_tile_available(x, y, width, height, atlas):
-                return [x, y]
+    if num_x == 0 or num_y == 0:
+        return []
+
+    cell, grid = get_atlas_occupancy(atlas, width, height)
+
+    return find_free_tile_in_grid(grid, cell, width, height, num_x, num_y)
 
-    return []
+def find_free_tile_in_grid(grid, cell, width, height, num_x, num_y):
+    cw = width // cell
+    ch = height // cell
+
+    # Reduce occupancy grid into blocks of requested size, then pick the first free block (row by row)
+    blocks = grid[:num_y * ch, :num_x * cw].reshape(num_y, ch, num_x, cw).any(axis=(1, 3))
+    free = numpy.flatnonzero(~blocks)
+    if len(free) == 0:
+        return []
+
+    y, x = divmod(int(free[0]), num_x)
+    return [x, y]
 
 def create_image_atlas(color='BLACK', size=8192, hdr=False, name=''):
 
@@ -89,33 +143,72 @@ def create_image_atlas_segment(atlas, width, height):
         segment.tile_x = tile[0]
         segment.tile_y = tile[1]
 
+        update_atlas_occupancy(atlas, segment)
+
     return segment
 
-def clear_segment(segment):
+def get_atlas_base_color(atlas):
+    if atlas.color == 'BLACK':
+        return (0.0, 0.0, 0.0, 1.0)
+    elif atlas.color == 'WHITE':
+        return (1.0, 1.0, 1.0, 1.0)
+    return (0.0, 0.0, 0.0, 0.0)
+
+def clear_segment(segment, use_cache=False):
     img = segment.id_data
     atlas = img.yia
 
-    if atlas.color == 'BLACK':
-        col = (0.0, 0.0, 0.0, 1.0)
-    elif atlas.color == 'WHITE':
-        col = (1.0, 1.0, 1.0, 1.0)
-    else:
-        col = (0.0, 0.0, 0.0, 0.0)
+    col = get_atlas_base_color(atlas)
 
-    set_image_pixels(img, col, segment)
+    set_image_pixels(img, col, segment, use_cache=use_cache)
+
+def clear_segments(atlas, segments):
+    img = atlas.id_data
+    col = get_atlas_base_color(atlas)
+
+    num_pixels = sum(segment.width * segment.height for segment in segments)
+
+    if not is_greater_than_283():
+        for segment in segments:
+            clear_segment(segment)
+        return num_pixels
+
+    # Segments never overlap, so each rectangle can be filled in place
+    pxs = get_image_pixels_mirror(img)
+    for segment in segments:
+        start_x = segment.width * segment.tile_x
+        start_y = segment.height * segment.tile_y
+        pxs[start_y:start_y+segment.height, start_x:start_x+segment.width] = col
+
+    # Write back the pixels only once
+    set_image_pixels_mirror(img, pxs)
+
+    return num_pixels
 
 def clear_unused_segments(atlas):
 
+    T = time.time()
+
+    unused_segments = [segment for segment in atlas.segments if segment.unused]
+    if not unused_segments: return 0, 0, 0.0
+
     # Recolor unused segments
-    for segment in atlas.segments:
-        if segment.unused:
-            clear_segment(segment)
+    num_pixels = clear_segments(atlas, unused_segments)
 
     # Remove unused segments
     for i, segment in reversed(list(enumerate(atlas.segments))):
         if segment.unused:
             atlas.segments.remove(i)
 
+    clear_atlas_occupancy_cache(atlas)
+
+    return len(unused_segments), num_pixels, time.time() - T
+
+def report_cleared_segments(operator, atlas, num_segments, num_pixels, elapsed):
+    if num_segments == 0: return
+    operator.report({'INFO'}, str(num_segments) + ' unused segment(s) of ' + atlas.id_data.name + ' are cleared, ' + 
+            str(num_pixels) + ' pixels reclaimed at ' + '{:0.2f}'.format(elapsed * 1000) + ' ms!')
+
 def is_there_any_unused_segments(atlas, width, height):
     for segment in atlas.segments:
         if segment.unused and segment.width >= width and segment.height >= height:
@@ -215,6 +308,151 @@ def replace_segment_with_image(yp, segment, image, uv_name=''):
 
     return entities
 
+def pack_atlas_segments(sizes, atlas_width, atlas_height):
+
+    # Cell size should be able to represent every segment
+    cell = math.gcd(atlas_width, atlas_height)
+    for w, h in sizes:
+        cell = math.gcd(cell, math.gcd(w, h))
+    cell = max(cell, 1)
+
+    grid = numpy.zeros(shape=(atlas_height // cell, atlas_width // cell), dtype=bool)
+
+    # Bigger segments first so smaller ones can fill the gaps
+    order = sorted(range(len(sizes)), key=lambda i: (sizes[i][1], sizes[i][0]), reverse=True)
+
+    tiles = [None] * len(sizes)
+    for i in order:
+        w, h = sizes[i]
+        num_x = atlas_width // w
+        num_y = atlas_height // h
+        if num_x == 0 or num_y == 0: return None
+
+        tile = find_free_tile_in_grid(grid, cell, w, h, num_x, num_y)
+        if not tile: return None
+
+        mark_atlas_occupancy(grid, cell, tile[0], tile[1], w, h)
+        tiles[i] = tile
+
+    return tiles
+
+def get_atlas_entities(atlas_img):
+
+    entities = []
+
+    for ng in bpy.data.node_groups:
+        if not hasattr(ng, 'yp') or not ng.yp.is_ypaint_node: continue
+        for layer in ng.yp.layers:
+            if layer.type == 'IMAGE' and layer.segment_name != '':
+                source = get_layer_source(layer)
+                if source and source.image == atlas_img:
+                    entities.append(layer)
+
+            for mask in layer.masks:
+                if mask.type == 'IMAGE' and mask.segment_name != '':
+                    source = get_mask_source(mask)
+                    if source and source.image == atlas_img:
+                        entities.append(mask)
+
+    return entities
+
+def compact_image_atlas(atlas, shrink=True, remove_empty=True):
+
+    img = atlas.id_data
+    width = img.size[0]
+    height = img.size[1]
+
+    live_segments = [segment for segment in atlas.segments if not segment.unused]
+
+    # Remove atlas without any used segment
+    if not live_segments:
+        if remove_empty:
+            discard_image_pixels_mirror(img)
+            clear_atlas_occupancy_cache(atlas)
+            safe_remove_image(img)
+            return True
+
+        clear_unused_segments(atlas)
+        return False
+
+    sizes = [(segment.width, segment.height) for segment in live_segments]
+    tiles = pack_atlas_segments(sizes, width, height)
+    if tiles == None: return False
+
+    # Try to halve the atlas as long as all segments still fit
+    if shrink:
+        while width % 2 == 0 and height % 2 == 0:
+            smaller_tiles = pack_atlas_segments(sizes, width // 2, height // 2)
+            if smaller_tiles == None: break
+            tiles = smaller_tiles
+            width //= 2
+            height //= 2
+
+    size_changed = width != img.size[0] or height != img.size[1]
+    moved = any(segment.tile_x != tiles[i][0] or segment.tile_y != tiles[i][1] for i, segment in enumerate(live_segments))
+    num_unused = len(atlas.segments) - len(live_segments)
+
+    # Nothing to do
+    if not size_changed and not moved and num_unused == 0:
+        return False
+
+    # Move pixel blocks to the new layout
+    if is_greater_than_283():
+        old_pxs = get_image_pixels_mirror(img)
+        discard_image_pixels_mirror(img)
+
+        new_pxs = numpy.empty(shape=(height, width, 4), dtype=numpy.float32)
+        new_pxs[:] = get_atlas_base_color(atlas)
+
+        for i, segment in enumerate(live_segments):
+            w = segment.width
+            h = segment.height
+            src_x = w * segment.tile_x
+            src_y = h * segment.tile_y
+            dst_x = w * tiles[i][0]
+            dst_y = h * tiles[i][1]
+            new_pxs[dst_y:dst_y+h, dst_x:dst_x+w] = old_pxs[src_y:src_y+h, src_x:src_x+w]
+
+        if size_changed:
+            img.scale(width, height)
+        img.pixels.foreach_set(new_pxs.ravel())
+
+    else:
+        # Older Blender only allowed to compact without resizing
+        if size_changed: return False
+
+        old_pxs = list(img.pixels)
+        new_pxs = list(get_atlas_base_color(atlas)) * (width * height)
+
+        for i, segment in enumerate(live_segments):
+            w = segment.width
+            for y in range(segment.height):
+                src_offset = (img.size[0] * (y + segment.height * segment.tile_y) + w * segment.tile_x) * 4
+                dst_offset = (width * (y + segment.height * tiles[i][1]) + w * tiles[i][0]) * 4
+                new_pxs[dst_offset : dst_offset + w * 4] = old_pxs[src_offset : src_offset + w * 4]
+
+        img.pixels = new_pxs
+
+    # Set new tiles
+    for i, segment in enumerate(live_segments):
+        segment.tile_x = tiles[i][0]
+        segment.tile_y = tiles[i][1]
+
+    # Remove unused segments
+    for i, segment in reversed(list(enumerate(atlas.segments))):
+        if segment.unused:
+            atlas.segments.remove(i)
+
+    clear_atlas_occupancy_cache(atlas)
+
+    # Update mapping of all entities using this atlas
+    for entity in get_atlas_entities(img):
+        update_mapping(entity)
+        if size_changed:
+            set_uv_neighbor_resolution(entity)
+
+    return True
+
 #class YUVTransformTest(bpy.types.Operator):
 #    bl_idname = "node.y_uv_transform_test"
 #    bl_label = "UV Transform Test"
@@ -491,6 +729,7 @@ class YConvertToImageAtlas(bpy.types.Operator):
     def poll(cls, context):
         return hasattr(context, 'image') and context.image and hasattr(context, 'entity')
 
+    @flush_image_pixels_mirrors_on_exit
     def execute(self, context):
         mat = get_active_material()
         node = get_active_ypaint_node()
@@ -543,7 +782,7 @@ class YConvertToImageAtlas(bpy.types.Operator):
 
                 # Copy image to segment
                 ia_image = new_segment.id_data
-                copy_image_pixels(image, ia_image, new_segment)
+                copy_image_pixels(image, ia_image, new_segment, cache_dest=True)
 
             # Copy bake info
             if image.y_bake_info.is_baked:
@@ -571,6 +810,9 @@ class YConvertToImageAtlas(bpy.types.Operator):
             if image.users == 0:
                 bpy.data.images.remove(image)
 
+        # Write back all modified image atlases
+        flush_image_pixels_mirrors()
+
         # Refresh linear nodes
         check_yp_linear_nodes(yp)
 
@@ -591,6 +833,7 @@ class YConvertToStandardImage(bpy.types.Operator):
     def poll(cls, context):
         return hasattr(context, 'image') and context.image and hasattr(context, 'entity')
 
+    @flush_image_pixels_mirrors_on_exit
     def execute(self, context):
         node = get_active_ypaint_node()
         yp = node.node_tree.yp
@@ -644,7 +887,7 @@ class YConvertToStandardImage(bpy.types.Operator):
 
             # Copy the pixels
             if image.yia.is_image_atlas:
-                copy_image_pixels(image, new_image, None, segment)
+                copy_image_pixels(image, new_image, None, segment, cache_src=True)
             else:
                 UDIM.copy_tiles(image, new_image, copy_dict)
 
@@ -680,6 +923,9 @@ class YConvertToStandardImage(bpy.types.Operator):
             if image not in image_atlases:
                 image_atlases.append(image)
 
+        # Release cached image atlas pixels
+        flush_image_pixels_mirrors()
+
         # Remove unused image atlas
         for ia_image in image_atlases:
             still_used = False
@@ -701,6 +947,69 @@ class YConvertToStandardImage(bpy.types.Operator):
 
         return {'FINISHED'}
 
+class YCompactImageAtlas(bpy.types.Operator):
+    bl_idname = "node.y_compact_image_atlas"
+    bl_label = "Compact Image Atlas"
+    bl_description = "Repack used segments of image atlas to remove holes left by deleted layers and masks"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    all_atlases : BoolProperty(
+            name = 'All Image Atlases',
+            description = 'Compact all image atlases used by the active tree instead of only the active one',
+            default=False)
+
+    shrink : BoolProperty(
+            name = 'Shrink Image Atlas',
+            description = 'Shrink image atlas size if all segments can fit in smaller image',
+            default=True)
+
+    remove_empty : BoolProperty(
+            name = 'Remove Empty Image Atlas',
+            description = 'Remove image atlas that has no used segment anymore',
+            default=True)
+
+    @classmethod
+    def poll(cls, context):
+        return hasattr(context, 'image') and context.image and context.image.yia.is_image_atlas
+
+    def execute(self, context):
+
+        T = time.time()
+
+        if self.all_atlases:
+            node = get_active_ypaint_node()
+            if not node:
+                self.report({'ERROR'}, "No active " + get_addon_title() + " node!")
+                return {'CANCELLED'}
+            images = [img for img in get_yp_images(node.node_tree.yp) if img.yia.is_image_atlas]
+        else:
+            images = [context.image]
+
+        # Image atlas can be removed while compacting
+        num_images = len(images)
+
+        num_compacted = 0
+        num_freed_pixels = 0
+        num_pixels = 0
+        for img in images:
+            name = img.name
+            ori_num_pixels = img.size[0] * img.size[1]
+            unused_pixels = sum(segment.width * segment.height for segment in img.yia.segments if segment.unused)
+
+            if compact_image_atlas(img.yia, self.shrink, self.remove_empty):
+                num_compacted += 1
+                num_freed_pixels += unused_pixels
+
+                # Removed atlas reclaims all of its pixels
+                img = bpy.data.images.get(name)
+                num_pixels += ori_num_pixels - (img.size[0] * img.size[1] if img else 0)
+
+        self.report({'INFO'}, str(num_compacted) + ' of ' + str(num_images) + ' image atlas(es) are compacted, ' + 
+                str(num_freed_pixels) + ' unused segment pixels freed, ' + str(num_pixels) + ' image pixels reclaimed at ' + 
+                '{:0.2f}'.format((time.time() - T) * 1000) + ' ms!')
+
+        return {'FINISHED'}
+
 class YImageAtlasSegments(bpy.types.PropertyGroup):
 
     name : StringProperty(
@@ -744,6 +1053,7 @@ def register():
     bpy.utils.register_class(YBackToOriginalUV)
     bpy.utils.register_class(YConvertToImageAtlas)
     bpy.utils.register_class(YConvertToStandardImage)
+    bpy.utils.register_class(YCompactImageAtlas)
     #bpy.utils.register_class(YImageSegmentOtherObject)
     #bpy.utils.register_class(YImageSegmentBakeInfoProps)
     bpy.utils.register_class(YImageAtlasSegments)
@@ -758,6 +1068,7 @@ def unregister():
     bpy.utils.unregister_class(YBackToOriginalUV)
     bpy.utils.unregister_class(YConvertToImageAtlas)
     bpy.utils.unregister_class(YConvertToStandardImage)
+    bpy.utils.unregister_class(YCompactImageAtlas)
     #bpy.utils.unregister_class(YImageSegmentOtherObject)
     #bpy.utils.unregister_class(YImageSegmentBakeInfoProps)
     bpy.utils.unregister_class(YImageAtlasSegments)
@@ -154,6 +154,7 @@ def add_new_layer(group_tree, layer_name, layer_type, channel_idx,
     parent_dict = set_parent_dict_val(yp, parent_dict, layer.name, parent_idx)
 
     yp.layers.move(last_index, index)
+    invalidate_layer_hierarchy(yp)
     layer = yp.layers[index] # Repoint to new index
 
     # Remap parents
@@ -948,6 +949,7 @@ class YNewLayer(bpy.types.Operator):
             col.label(text='INFO: An unused atlas segment can be used.', icon='ERROR')
             col.label(text='It will take a couple seconds to clear.')
 
+    @batch_active_tree_updates
     def execute(self, context):
 
         T = time.time()
@@ -995,7 +997,9 @@ class YNewLayer(bpy.types.Operator):
 
         # Clearing unused image atlas segments
         img_atlas = self.get_to_be_cleared_image_atlas(context, yp)
-        if img_atlas: ImageAtlas.clear_unused_segments(img_atlas.yia)
+        if img_atlas:
+            num_segments, num_pixels, elapsed = ImageAtlas.clear_unused_segments(img_atlas.yia)
+            ImageAtlas.report_cleared_segments(self, img_atlas.yia, num_segments, num_pixels, elapsed)
 
         img = None
         segment = None
@@ -1947,6 +1951,7 @@ class YOpenImageToLayer(bpy.types.Operator, ImportHelper):
         if UDIM.is_udim_supported():
             self.layout.prop(self, 'use_udim_detecting')
 
+    @batch_active_tree_updates
     def execute(self, context):
         T = time.time()
 
@@ -2418,6 +2423,7 @@ class YOpenAvailableDataToLayer(bpy.types.Operator):
             else: 
                 rrow.prop(self, 'blend_type', text='')
 
+    @batch_active_tree_updates
     def execute(self, context):
         T = time.time()
 
@@ -2496,6 +2502,7 @@ class YMoveInOutLayerGroup(bpy.types.Operator):
         group_node = get_active_ypaint_node()
         return group_node and len(group_node.node_tree.yp.layers) > 0
 
+    @batch_active_tree_updates
     def execute(self, context):
         T = time.time()
 
@@ -2528,6 +2535,7 @@ class YMoveInOutLayerGroup(bpy.types.Operator):
 
             last_member_idx = get_last_child_idx(layer)
             yp.layers.move(neighbor_idx, last_member_idx)
+            invalidate_layer_hierarchy(yp)
 
             yp.active_layer_index = neighbor_idx
 
@@ -2552,6 +2560,7 @@ class YMoveInOutLayerGroup(bpy.types.Operator):
                 parent_dict = set_parent_dict_val(yp, parent_dict, layer.name, neighbor_idx)
 
                 yp.layers.move(neighbor_idx, layer_idx)
+                invalidate_layer_hierarchy(yp)
                 yp.active_layer_index = layer_idx+1
 
         # Remap parents
@@ -2600,6 +2609,7 @@ class YMoveLayer(bpy.types.Operator):
         group_node = get_active_ypaint_node()
         return group_node and len(group_node.node_tree.yp.layers) > 0
 
+    @batch_active_tree_updates
     def execute(self, context):
         T = time.time()
 
@@ -2639,6 +2649,7 @@ class YMoveLayer(bpy.types.Operator):
 
                 # Swap layer
                 yp.layers.move(neighbor_idx, last_member_idx)
+                invalidate_layer_hierarchy(yp)
                 yp.active_layer_index = neighbor_idx
 
             # Group layer DOWN to standard layer
@@ -2647,6 +2658,7 @@ class YMoveLayer(bpy.types.Operator):
 
                 # Swap layer
                 yp.layers.move(neighbor_idx, layer_idx)
+                invalidate_layer_hierarchy(yp)
                 yp.active_layer_index = layer_idx+1
 
         elif layer.type == 'GROUP' and neighbor_layer.type == 'GROUP':
@@ -2658,6 +2670,7 @@ class YMoveLayer(bpy.types.Operator):
                 # Swap all related layers
                 for i in range(last_member_idx+1 - layer_idx):
                     yp.layers.move(layer_idx+i, neighbor_idx+i)
+                    invalidate_layer_hierarchy(yp)
 
                 yp.active_layer_index = neighbor_idx
 
@@ -2671,6 +2684,7 @@ class YMoveLayer(bpy.types.Operator):
                 # Swap all related layers
                 for i in range(num_members):
                     yp.layers.move(neighbor_idx+i, layer_idx+i)
+                    invalidate_layer_hierarchy(yp)
 
                 yp.active_layer_index = layer_idx+num_members
 
@@ -2682,6 +2696,7 @@ class YMoveLayer(bpy.types.Operator):
 
                 # Swap layer
                 yp.layers.move(layer_idx, neighbor_idx)
+                invalidate_layer_hierarchy(yp)
                 yp.active_layer_index = neighbor_idx
 
                 start_remap = neighbor_idx + 2
@@ -2695,6 +2710,7 @@ class YMoveLayer(bpy.types.Operator):
 
                 # Swap layer
                 yp.layers.move(layer_idx, last_neighbor_member_idx)
+                invalidate_layer_hierarchy(yp)
                 yp.active_layer_index = last_neighbor_member_idx
 
                 start_remap = layer_idx + 1
@@ -2706,6 +2722,7 @@ class YMoveLayer(bpy.types.Operator):
 
             # Swap layer
             yp.layers.move(layer_idx, neighbor_idx)
+            invalidate_layer_hierarchy(yp)
             yp.active_layer_index = neighbor_idx
 
         # Remap parents
@@ -2851,6 +2868,7 @@ def remove_layer(yp, index):
 
     # Delete the layer
     yp.layers.remove(index)
+    invalidate_layer_hierarchy(yp)
 
 def draw_remove_group(self, context):
     col = self.layout.column()
@@ -2923,6 +2941,7 @@ class YRemoveLayer(bpy.types.Operator):
             col.label(text='You cannot UNDO after removal', icon='BLANK1')
             col.label(text='Are you sure want to continue?', icon='BLANK1')
 
+    @batch_active_tree_updates
     def execute(self, context):
         T = time.time()
 
@@ -3411,6 +3430,7 @@ class YReplaceLayerType(bpy.types.Operator):
             split.label(text='Vertex Color:')
             split.prop_search(self, "item_name", self, "item_coll", text='', icon='GROUP_VCOL')
 
+    @batch_active_tree_updates
     def execute(self, context):
 
         T = time.time()
@@ -3701,6 +3721,7 @@ class YDuplicateLayer(bpy.types.Operator):
         group_node = get_active_ypaint_node()
         return context.object and group_node and len(group_node.node_tree.yp.layers) > 0
 
+    @batch_active_tree_updates
     def execute(self, context):
         T = time.time()
 
@@ -3771,6 +3792,7 @@ class YDuplicateLayer(bpy.types.Operator):
         for i, idx in enumerate(created_ids):
             relevant_id = relevant_ids[i]
             yp.layers.move(idx, relevant_id)
+            invalidate_layer_hierarchy(yp)
 
         # Remap parent index
         for lay in yp.layers:
@@ -3835,6 +3857,7 @@ class YPasteLayer(bpy.types.Operator):
         group_node = get_active_ypaint_node()
         return context.object and group_node
 
+    @batch_active_tree_updates
     def execute(self, context):
         T = time.time()
 
@@ -3944,6 +3967,7 @@ class YPasteLayer(bpy.types.Operator):
             nl = yp.layers.get(lname)
             idx = get_layer_index_by_name(yp, lname)
             yp.layers.move(idx, cur_idx+i)
+            invalidate_layer_hierarchy(yp)
 
         for i, lname in enumerate(pasted_layer_names):
             nl = yp.layers.get(lname)
@@ -4061,6 +4085,7 @@ def update_layer_channel_override(self, context):
     # Reselect layer so vcol or image will be updated
     yp.active_layer_index = yp.active_layer_index
 
+@batch_entity_tree_updates
 def update_channel_enable(self, context):
     T = time.time()
     yp = self.id_data.yp
@@ -4447,6 +4472,7 @@ def group_trash_update(yp):
 
                 tree.nodes.remove(node)
 
+@batch_entity_tree_updates
 def update_layer_enable(self, context):
     T = time.time()
     yp = self.id_data.yp
@@ -4982,6 +5008,10 @@ class YLayerChannel(bpy.types.PropertyGroup):
     expand_source : BoolProperty(default=False)
     expand_source_1 : BoolProperty(default=False)
 
+def update_layer_hierarchy(self, context):
+    # Cached layer hierarchy need to be rebuilt after parent or type changes
+    invalidate_layer_hierarchy(self.id_data.yp)
+
 def update_layer_color_chortcut(self, context):
     layer = self
     yp = layer.id_data.yp
@@ -5046,7 +5076,8 @@ class YLayer(bpy.types.PropertyGroup):
     type : EnumProperty(
             name = 'Layer Type',
             items = layer_type_items,
-            default = 'IMAGE')
+            default = 'IMAGE',
+            update=update_layer_hierarchy)
 
     color_shortcut : BoolProperty(
             name = 'Color Shortcut on the list',
@@ -5119,7 +5150,7 @@ class YLayer(bpy.types.PropertyGroup):
     uv_name : StringProperty(default='', update=update_uv_name)
 
     # Parent index
-    parent_idx : IntProperty(default=-1)
+    parent_idx : IntProperty(default=-1, update=update_layer_hierarchy)
 
     # Transform
     translation : FloatVectorProperty(
@@ -456,6 +456,7 @@ class YNewLayerMask(bpy.types.Operator):
         if len(self.layer.masks) > 0:
             col.prop(self, 'blend_type', text='')
 
+    @batch_active_tree_updates
     def execute(self, context):
         if self.auto_cancel: return {'CANCELLED'}
 
@@ -477,7 +478,9 @@ class YNewLayerMask(bpy.types.Operator):
 
         # Clearing unused image atlas segments
         img_atlas = self.get_to_be_cleared_image_atlas(context, yp)
-        if img_atlas: ImageAtlas.clear_unused_segments(img_atlas.yia)
+        if img_atlas:
+            num_segments, num_pixels, elapsed = ImageAtlas.clear_unused_segments(img_atlas.yia)
+            ImageAtlas.report_cleared_segments(self, img_atlas.yia, num_segments, num_pixels, elapsed)
 
         # Check if layer with same name is already available
         if self.type == 'IMAGE':
@@ -682,6 +685,7 @@ class YOpenImageAsMask(bpy.types.Operator, ImportHelper):
 
         self.layout.prop(self, 'relative')
 
+    @batch_active_tree_updates
     def execute(self, context):
         T = time.time()
         if not hasattr(self, 'layer'): return {'CANCELLED'}
@@ -824,6 +828,7 @@ class YOpenAvailableDataAsMask(bpy.types.Operator):
         if len(self.layer.masks) > 0:
             col.prop(self, 'blend_type', text='')
 
+    @batch_active_tree_updates
     def execute(self, context):
         if not hasattr(self, 'layer'): return {'CANCELLED'}
 
@@ -903,6 +908,7 @@ class YMoveLayerMask(bpy.types.Operator):
     def poll(cls, context):
         return hasattr(context, 'mask') and hasattr(context, 'layer')
 
+    @batch_active_tree_updates
     def execute(self, context):
         mask = context.mask
         layer = context.layer
@@ -946,6 +952,7 @@ class YRemoveLayerMask(bpy.types.Operator):
     def poll(cls, context):
         return hasattr(context, 'mask') and hasattr(context, 'layer')
 
+    @batch_active_tree_updates
     def execute(self, context):
         mask = context.mask
         layer = context.layer
@@ -1102,6 +1109,7 @@ def update_mask_intensity_value(self, context):
     for c in mask.channels:
         update_mask_channel_intensity_value(c, context)
 
+@batch_entity_tree_updates
 def update_layer_mask_channel_enable(self, context):
     yp = self.id_data.yp
     if yp.halt_update: return
@@ -1138,6 +1146,7 @@ def update_layer_mask_channel_enable(self, context):
 
     update_mask_channel_intensity_value(self, context)
 
+@batch_entity_tree_updates
 def update_layer_mask_enable(self, context):
     yp = self.id_data.yp
     if yp.halt_update: return
@@ -1156,6 +1165,7 @@ def update_layer_mask_enable(self, context):
 
     self.active_edit = self.enable and self.type in {'IMAGE', 'VCOL', 'COLOR_ID'}
 
+@batch_entity_tree_updates
 def update_enable_layer_masks(self, context):
     yp = self.id_data.yp
     if yp.halt_update: return
@@ -1089,6 +1089,7 @@ class YNewYPaintChannel(bpy.types.Operator):
             col.prop(self, "colorspace", text='')
         if self.type != 'NORMAL': col.prop(self, 'use_clamp')
 
+    @batch_active_tree_updates
     def execute(self, context):
 
         T = time.time()
@@ -1168,6 +1169,7 @@ class YMoveYPaintChannel(bpy.types.Operator):
         group_node = get_active_ypaint_node()
         return group_node and len(group_node.node_tree.yp.channels) > 0
 
+    @batch_active_tree_updates
     def execute(self, context):
         T = time.time()
 
@@ -1243,6 +1245,7 @@ class YRemoveYPaintChannel(bpy.types.Operator):
         group_node = get_active_ypaint_node()
         return group_node and len(group_node.node_tree.yp.channels) > 0
 
+    @batch_active_tree_updates
     def execute(self, context):
         T = time.time()
 
@@ -1991,6 +1994,30 @@ class YCleanYPCaches(bpy.types.Operator):
 
         return {'FINISHED'}
 
+class YArrangeYPaintNodes(bpy.types.Operator):
+    bl_idname = "node.y_arrange_yp_nodes"
+    bl_label = "Arrange " + get_addon_title() + " Nodes"
+    bl_description = "Arrange all nodes inside " + get_addon_title() + " tree"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    @classmethod
+    def poll(cls, context):
+        return get_active_ypaint_node()
+
+    def execute(self, context):
+        node = get_active_ypaint_node()
+        tree = node.node_tree
+        yp = tree.yp
+
+        # Mark all layers so everything will be arranged
+        for layer in yp.layers:
+            mark_layout_dirty(tree, layer)
+        mark_layout_dirty(tree)
+
+        arrange_dirty_tree(tree)
+
+        return {'FINISHED'}
+
 def update_channel_name(self, context):
     T = time.time()
 
@@ -3507,6 +3534,10 @@ def ypaint_last_object_update(scene):
         # Out of edit mode
         if obj.mode != 'EDIT' and scene.yp.last_mode == 'EDIT':
             scene.yp.last_mode = obj.mode
+
+            # Uv might be edited, so temp uv should be recreated
+            clear_temp_uv_cache(obj)
+
             space = get_edit_image_editor_space(bpy.context)
             if space:
                 space.use_image_pin = False
@@ -3521,6 +3552,10 @@ def ypaint_last_object_update(scene):
         if scene.yp.last_mode != obj.mode:
             scene.yp.last_mode = obj.mode
 
+@persistent
+def ypaint_clear_layer_caches(scene):
+    clear_layer_caches()
+
 @persistent
 def ypaint_force_update_on_anim(scene):
     #print(scene.frame_current)
@@ -3596,6 +3631,7 @@ def register():
     bpy.utils.register_class(YDuplicateYPNodes)
     bpy.utils.register_class(YFixMissingData)
     bpy.utils.register_class(YRefreshTangentSignVcol)
+    bpy.utils.register_class(YArrangeYPaintNodes)
     bpy.utils.register_class(YRemoveYPaintNode)
     bpy.utils.register_class(YCleanYPCaches)
     bpy.utils.register_class(YNodeConnections)
@@ -3626,6 +3662,10 @@ def register():
         bpy.app.handlers.scene_update_pre.append(ypaint_hacks_and_scene_updates)
 
     bpy.app.handlers.frame_change_pre.append(ypaint_force_update_on_anim)
+    bpy.app.handlers.save_pre.append(ypaint_arrange_dirty_trees_on_save)
+    bpy.app.handlers.load_post.append(ypaint_clear_layer_caches)
+    bpy.app.handlers.undo_post.append(ypaint_clear_layer_caches)
+    bpy.app.handlers.redo_post.append(ypaint_clear_layer_caches)
 
 def unregister():
     bpy.utils.unregister_class(YSelectMaterialPolygons)
@@ -3645,6 +3685,7 @@ def unregister():
     bpy.utils.unregister_class(YDuplicateYPNodes)
     bpy.utils.unregister_class(YFixMissingData)
     bpy.utils.unregister_class(YRefreshTangentSignVcol)
+    bpy.utils.unregister_class(YArrangeYPaintNodes)
     bpy.utils.unregister_class(YRemoveYPaintNode)
     bpy.utils.unregister_class(YCleanYPCaches)
     bpy.utils.unregister_class(YNodeConnections)
@@ -3666,4 +3707,12 @@ def unregister():
         bpy.app.handlers.scene_update_pre.remove(ypaint_last_object_update)
 
     bpy.app.handlers.frame_change_pre.remove(ypaint_force_update_on_anim)
+    bpy.app.handlers.save_pre.remove(ypaint_arrange_dirty_trees_on_save)
+    bpy.app.handlers.load_post.remove(ypaint_clear_layer_caches)
+    bpy.app.handlers.undo_post.remove(ypaint_clear_layer_caches)
+    bpy.app.handlers.redo_post.remove(ypaint_clear_layer_caches)
+
+    # Remove lazy node arrangement timer
+    if is_greater_than_280() and bpy.app.timers.is_registered(check_layout_dirty_trees):
+        bpy.app.timers.unregister(check_layout_dirty_trees)
 
@@ -1,4 +1,4 @@
-import bpy, numpy, os, tempfile, shutil
+import bpy, numpy, os, tempfile, shutil, zlib, concurrent.futures
 from bpy.props import *
 from .common import *
 from . import lib, BakeInfo
@@ -64,66 +64,100 @@ def fill_tile(image, tilenum, color=None, width=0, height=0, empty_only=False):
     return True
 
 def copy_udim_pixels(src, dest):
+    tilenums = []
     for tile in src.tiles:
         # Check if tile number exists on both images and has same sizes
         dtile = dest.tiles.get(tile.number)
         if not dtile: continue
         if tile.size[0] != dtile.size[0] or tile.size[1] != dtile.size[1]: continue
+        tilenums.append(tile.number)
 
-        # Swap first
-        if tile.number != 1001:
-            swap_tile(src, 1001, tile.number)
-            swap_tile(dest, 1001, tile.number)
-
+    for tilenum in iterate_tiles([src, dest], tilenums):
         # Set pixels
-        dst.pixels = list(src.pixels)
+        copy_image_pixels(src, dest)
 
-        # Swap back
-        if tile.number != 1001:
-            swap_tile(src, 1001, tile.number)
-            swap_tile(dest, 1001, tile.number)
+# Cached UV information per mesh and UV name
+# Each entry is [uv checksum, unique floored uv coordinates, is udim]
+_uv_tile_cache = {}
 
-def get_tile_numbers(objs, uv_name):
+def clear_uv_tile_cache():
+    _uv_tile_cache.clear()
 
-    tiles = [1001]
+def get_mesh_uv_tile_info(mesh, uv_name, buf=None):
 
-    if not is_udim_supported(): return tiles
+    uv = mesh.uv_layers.get(uv_name)
+    if not uv: return None
 
-    T = time.time()
+    num_values = len(mesh.loops) * 2
 
-    # Get active object
-    obj = bpy.context.object
-    ori_mode = 'OBJECT'
-    if obj in objs and obj.mode != 'OBJECT':
-        ori_mode = obj.mode
-        bpy.ops.object.mode_set(mode='OBJECT')
+    # Reuse preallocated buffer if possible
+    if buf is not None and len(buf) >= num_values:
+        uv_arr = buf[:num_values]
+    else: uv_arr = numpy.empty(num_values, dtype=numpy.float32)
+    uv.data.foreach_get('uv', uv_arr)
 
-    arr = numpy.empty(0, dtype=numpy.float32)
+    # Cheap checksum to detect UV changes
+    checksum = (num_values, zlib.adler32(uv_arr.data))
 
-    # Get all uv coordinates
-    for o in objs:
-        uv = o.data.uv_layers.get(uv_name)
-        if not uv: continue
-    
-        uv_arr = numpy.zeros(len(o.data.loops)*2, dtype=numpy.float32)
-        uv.data.foreach_get('uv', uv_arr)
-        arr = numpy.append(arr, uv_arr)
+    key = (mesh.name, uv_name)
+    cache = _uv_tile_cache.get(key)
+    if cache and cache[0] == checksum:
+        return cache
+
+    is_udim = bool(numpy.any(uv_arr > 1.0 + UV_TOLERANCE/2))
 
     # Reshape the array to 2D
-    arr.shape = (arr.shape[0]//2, 2)
+    arr = uv_arr.reshape(-1, 2)
 
     # Tolerance to skip value around x.0
     trange = [UV_TOLERANCE/2.0, 1.0-(UV_TOLERANCE/2.0)]
-    arr = arr[((arr[:,0]-(numpy.floor(arr[:,0]))) >= trange[0]) &
-              ((arr[:,0]-(numpy.floor(arr[:,0]))) <= trange[1]) & 
-              ((arr[:,1]-(numpy.floor(arr[:,1]))) >= trange[0]) &
-              ((arr[:,1]-(numpy.floor(arr[:,1]))) <= trange[1])]
+    floored = numpy.floor(arr)
+    fract = arr - floored
+    valid = ((fract[:,0] >= trange[0]) & (fract[:,0] <= trange[1]) & 
+             (fract[:,1] >= trange[0]) & (fract[:,1] <= trange[1]))
+
+    # Get unique value only
+    coords = numpy.unique(floored[valid].astype(int), axis=0)
+
+    cache = _uv_tile_cache[key] = [checksum, coords, is_udim]
+
+    return cache
+
+def get_objects_uv_tile_infos(objs, uv_name):
+
+    # Make sure mesh data from edit mode is up to date without switching modes
+    for o in objs:
+        if o.mode == 'EDIT':
+            o.update_from_editmode()
+
+    # Preallocate buffer for the biggest mesh
+    meshes = []
+    for o in objs:
+        if o.data not in meshes:
+            meshes.append(o.data)
+    max_values = max([len(m.loops) * 2 for m in meshes], default=0)
+    buf = numpy.empty(max_values, dtype=numpy.float32)
 
-    # Floor array to integer
-    arr = numpy.floor(arr).astype(int)
+    infos = []
+    for m in meshes:
+        info = get_mesh_uv_tile_info(m, uv_name, buf)
+        if info: infos.append(info)
+
+    return infos
+
+def get_tile_numbers(objs, uv_name):
+
+    tiles = [1001]
+
+    if not is_udim_supported(): return tiles
+
+    T = time.time()
+
+    infos = get_objects_uv_tile_infos(objs, uv_name)
+    if not infos: return tiles
 
     # Get unique value only
-    arr = numpy.unique(arr, axis=0)
+    arr = numpy.unique(numpy.concatenate([info[1] for info in infos]), axis=0)
     
     # Get the udim representation
     for i in arr:
@@ -137,9 +171,6 @@ def get_tile_numbers(objs, uv_name):
         if tile not in tiles:
             tiles.append(tile)
     
-    if ori_mode != 'OBJECT':
-        bpy.ops.object.mode_set(mode=ori_mode)
-
     print('INFO: Getting tile numbers are done at', '{:0.2f}'.format((time.time() - T) * 1000), 'ms!')
         
     return tiles
@@ -150,28 +181,8 @@ def is_uvmap_udim(objs, uv_name):
 
     T = time.time()
 
-    # Get active object
-    obj = bpy.context.object
-    ori_mode = 'OBJECT'
-    if obj in objs and obj.mode != 'OBJECT':
-        ori_mode = obj.mode
-        bpy.ops.object.mode_set(mode='OBJECT')
-
-    arr = numpy.empty(0, dtype=numpy.float32)
-
-    # Get all uv coordinates
-    for o in objs:
-        uv = o.data.uv_layers.get(uv_name)
-        if not uv: continue
-    
-        uv_arr = numpy.zeros(len(o.data.loops)*2, dtype=numpy.float32)
-        uv.data.foreach_get('uv', uv_arr)
-        arr = numpy.append(arr, uv_arr)
-
-    if ori_mode != 'OBJECT':
-        bpy.ops.object.mode_set(mode=ori_mode)
-
-    is_udim = numpy.any(arr > 1.0 + UV_TOLERANCE/2)
+    infos = get_objects_uv_tile_infos(objs, uv_name)
+    is_udim = any(info[2] for info in infos)
 
     print('INFO: UDIM checking is done at', '{:0.2f}'.format((time.time() - T) * 1000), 'ms!')
 
@@ -221,6 +232,81 @@ def set_udim_filepath(image, filename, directory):
     #    os.makedirs(directory)
     image.filepath = filepath
 
+def get_temp_udim_compression(image):
+    # Temporary files can use faster compression since they only exist for a moment
+    if not is_using_temp_dir(image): return None
+
+    ypup = get_user_preferences()
+    if ypup.udim_temp_compression == 'FAST':
+        return 15
+    elif ypup.udim_temp_compression == 'NONE':
+        return 0
+    return None
+
+def get_file_mtime(path):
+    try: return os.stat(path).st_mtime_ns
+    except: return None
+
+def save_image_file(image, compression=None):
+    # Image.save() has no PNG compression option, so use save as render with temporary scene settings instead
+    # Save as render applies view transform, so only 8-bit sRGB images can use it without changing the pixels,
+    # Float, Non-Color, and Linear images are saved as is to avoid any color transform
+    # Tiled images need Blender 3.3+ to be saved as render
+    if (compression == None or image.is_float or image.file_format != 'PNG' or 
+            image.colorspace_settings.name != 'sRGB' or
+            (image.source == 'TILED' and not is_greater_than_330())):
+        image.save()
+        return False
+
+    tmpscene = bpy.data.scenes.new('Temp UDIM Save Scene')
+    tmpscene.view_settings.view_transform = 'Standard'
+
+    settings = tmpscene.render.image_settings
+    settings.file_format = 'PNG'
+    settings.color_mode = 'RGBA'
+    settings.color_depth = '8'
+    settings.compression = compression
+
+    # Remember tile file times to check if every tile is really written
+    tile_paths = []
+    if image.source == 'TILED':
+        tile_paths = [get_tile_filepath(image, tile.number) for tile in image.tiles]
+    ori_mtimes = [get_file_mtime(path) for path in tile_paths]
+
+    success = True
+    try: 
+        image.save_render(bpy.path.abspath(image.filepath), scene=tmpscene)
+    except Exception as e:
+        print('WARNING: Saving', image.name, 'as render failed!', e)
+        success = False
+    finally:
+        bpy.data.scenes.remove(tmpscene)
+
+    if success and any(path == '' or get_file_mtime(path) in {None, mtime} for path, mtime in zip(tile_paths, ori_mtimes)):
+        print('WARNING: Saving', image.name, 'as render did not write all tiles!')
+        success = False
+
+        # Remove the file written using the unresolved UDIM path
+        path = bpy.path.abspath(image.filepath)
+        if '<UDIM>' in path and os.path.isfile(path):
+            try: os.remove(path)
+            except Exception as e: print(e)
+
+    # Fallback to default save
+    if not success:
+        image.save()
+
+    return success
+
+def save_udim_image(image):
+    T = time.time()
+
+    # Saving as render doesn't make the image clean, so load it back from the saved files
+    if save_image_file(image, get_temp_udim_compression(image)):
+        image.reload()
+
+    print('UDIM: Saving', image.name, 'is done at', '{:0.2f}'.format((time.time() - T) * 1000), 'ms!')
+
 # UDIM need filepath to work, 
 # So there's need to initialize filepath for every udim image created
 def initial_pack_udim(image, base_color=None, filename=''):
@@ -255,7 +341,7 @@ def initial_pack_udim(image, base_color=None, filename=''):
         use_temp_dir = True
 
     # Save then pack
-    image.save()
+    save_udim_image(image)
     if use_packed or use_temp_dir:
         image.pack()
 
@@ -293,7 +379,7 @@ def swap_tiles(image, swap_dict, reverse=False):
 
         # Save the image first
         if not image_saved:
-            image.save()
+            save_udim_image(image)
             image_saved = True
 
         print('UDIM: Swapping tile', tilenum0, 'to', tilenum1)
@@ -322,7 +408,7 @@ def swap_tiles(image, swap_dict, reverse=False):
 
         # Reload to update image
         image.reload()
-        image.save()
+        save_udim_image(image)
 
         # Repack image
         if ori_packed:
@@ -337,6 +423,160 @@ def swap_tile(image, tilenum0, tilenum1):
     swap_dict[tilenum0] = tilenum1
     swap_tiles(image, swap_dict)
 
+def iterate_tiles(images, tilenums):
+    # Yield every tile number while its data is accessible from tile 1001.
+    # Instead of swapping every tile to 1001 and back, tiles are rotated through 1001,
+    # and the original layout is recovered with a single rearrange at the end.
+    # This halves the amount of save/reload round trips for loops over tiles.
+    images = [image for image in images if image.source == 'TILED']
+
+    # Key is tile slot and value is tile number of the data it currently holds
+    contents = {}
+
+    # Key is tile number of the data and value is tile slot it currently lives in
+    locations = {}
+
+    try:
+        for tilenum in tilenums:
+            slot = locations.get(tilenum, tilenum)
+
+            if slot != 1001 and images:
+                for image in images:
+                    swap_tile(image, 1001, slot)
+
+                content0 = contents.get(1001, 1001)
+                content1 = contents.get(slot, slot)
+                contents[1001] = content1
+                contents[slot] = content0
+                locations[content1] = 1001
+                locations[content0] = slot
+
+            yield tilenum
+
+    finally:
+        # Move all tiles back to their original slots
+        convert_dict = {slot : tilenum for slot, tilenum in contents.items() if slot != tilenum}
+        if convert_dict:
+            for image in images:
+                rearrange_tiles(image, convert_dict)
+
+def get_tile_filepath(image, tilenum):
+    directory = os.path.dirname(bpy.path.abspath(image.filepath))
+    filename = bpy.path.basename(image.filepath)
+    splits = filename.split('.<UDIM>.')
+    if len(splits) != 2: return ''
+    return os.path.join(directory, splits[0] + '.' + str(tilenum) + '.' + splits[1])
+
+def process_tiles_in_memory(images, tilenums, func):
+    # Run func(tilenum, pxs_list) on tiles one by one while their data is accessible from tile 1001
+    for tilenum in iterate_tiles(images, tilenums):
+        pxs_list = []
+        for image in images:
+            pxs = numpy.empty(shape=image.size[0]*image.size[1]*4, dtype=numpy.float32)
+            image.pixels.foreach_get(pxs)
+            pxs.shape = (-1, image.size[0], 4)
+            pxs_list.append(pxs)
+
+        for image, pxs in zip(images, func(tilenum, pxs_list)):
+            if pxs is None: continue
+            if pxs.shape[1] != image.size[0] or pxs.shape[0] != image.size[1]:
+                image.scale(pxs.shape[1], pxs.shape[0])
+            image.pixels.foreach_set(pxs.ravel())
+
+def process_tiles(images, tilenums, func, max_workers=None):
+    # Run func(tilenum, pxs_list) on every tile of the images without swapping tiles to 1001.
+    # Each tile file is loaded as separate image, so tiles can be processed by multiple threads.
+    # Func should return list containing new pixels for each image, or None if it's not changed.
+    # Func will run on worker threads, so it should not access any blender data.
+    if max_workers == None: max_workers = os.cpu_count() or 1
+
+    # Single tile doesn't need the file round trip
+    if len(tilenums) == 1:
+        process_tiles_in_memory(images, tilenums, func)
+        return
+
+    # Remember stuff
+    ori_packeds = [bool(image.packed_file) for image in images]
+    for image in images:
+        save_udim_image(image)
+
+    # Tiles without files will be processed from memory
+    missing_tilenums = []
+
+    # Process tiles in batches to limit memory usage
+    for i in range(0, len(tilenums), max_workers):
+        batch = tilenums[i:i+max_workers]
+
+        tile_imgs = {}
+        pxs_lists = {}
+        for tilenum in batch:
+            paths = [get_tile_filepath(image, tilenum) for image in images]
+            if not all(os.path.isfile(path) for path in paths): 
+                missing_tilenums.append(tilenum)
+                continue
+
+            imgs = []
+            pxs_list = []
+            for image, path in zip(images, paths):
+                img = bpy.data.images.load(path, check_existing=False)
+
+                # Tile image need the same colorspace so saving it won't apply any color transform to non-color data
+                img.colorspace_settings.name = image.colorspace_settings.name
+                pxs = numpy.empty(shape=img.size[0]*img.size[1]*4, dtype=numpy.float32)
+                img.pixels.foreach_get(pxs)
+                pxs.shape = (-1, img.size[0], 4)
+                imgs.append(img)
+                pxs_list.append(pxs)
+
+            tile_imgs[tilenum] = imgs
+            pxs_lists[tilenum] = pxs_list
+
+        # Heavy numpy operations release the GIL, so threads can run in parallel
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {tilenum : executor.submit(func, tilenum, pxs_list) for tilenum, pxs_list in pxs_lists.items()}
+            results = {tilenum : future.result() for tilenum, future in futures.items()}
+
+        # Write results back to tile files
+        for tilenum, imgs in tile_imgs.items():
+            for image, img, pxs in zip(images, imgs, results[tilenum]):
+                if pxs is not None:
+                    print('UDIM: Writing processed tile', tilenum, 'of', image.name)
+                    if pxs.shape[1] != img.size[0] or pxs.shape[0] != img.size[1]:
+                        img.scale(pxs.shape[1], pxs.shape[0])
+                    img.pixels.foreach_set(pxs.ravel())
+                    save_image_file(img, get_temp_udim_compression(image))
+                bpy.data.images.remove(img)
+
+    for image, ori_packed in zip(images, ori_packeds):
+
+        # Reload to update image
+        image.reload()
+
+        # Repack image
+        if ori_packed:
+            image.pack()
+
+            # Remove file if they are using temporary directory
+            if is_using_temp_dir(image):
+                directory = os.path.dirname(bpy.path.abspath(image.filepath))
+                remove_udim_files_from_disk(image, directory, True)
+
+    if missing_tilenums:
+        print('UDIM: Tile file(s)', ', '.join(str(t) for t in missing_tilenums), 'of', ', '.join(image.name for image in images), 'are not found, processing them from memory...')
+        process_tiles_in_memory(images, missing_tilenums, func)
+
+def copy_tiles_channel_pixels(src, dest, tilenums, src_idx=0, dest_idx=0):
+    if src.source != 'TILED' or dest.source != 'TILED':
+        copy_image_channel_pixels(src, dest, src_idx, dest_idx)
+        return
+
+    def copy_tile_channel(tilenum, pxs_list):
+        src_pxs, dest_pxs = pxs_list
+        dest_pxs[..., dest_idx] = src_pxs[..., src_idx]
+        return [None, dest_pxs]
+
+    process_tiles([src, dest], tilenums, copy_tile_channel)
+
 def copy_tiles(image0, image1, copy_dict):
 
     # Directory of images
@@ -379,8 +619,8 @@ def copy_tiles(image0, image1, copy_dict):
 
         # Save the image first
         if not image_saved:
-            image0.save()
-            image1.save()
+            save_udim_image(image0)
+            save_udim_image(image1)
             image_saved = True
 
         print('UDIM: Copying tile', tilenum0, '(' + image0.name + ') to', tilenum1, '(' + image1.name + ')')
@@ -396,7 +636,7 @@ def copy_tiles(image0, image1, copy_dict):
         #image0.reload()
         image1.reload()
         #image0.save()
-        image1.save()
+        save_udim_image(image1)
 
         # Repack image 0
         if ori0_packed:
@@ -434,7 +674,7 @@ def remove_tiles(image, tilenums):
 
         # Save the image first
         if not image_saved:
-            image.save()
+            save_udim_image(image)
             image_saved = True
 
         print('UDIM: Removing tile', tilenum)
@@ -736,7 +976,7 @@ def rearrange_tiles(image, convert_dict):
 
         # Save the image first
         if not image_saved:
-            image.save()
+            save_udim_image(image)
             image_saved = True
 
         print('UDIM: Rename tile', tilenum0, 'to', tilenum1, '(' + image.name + ')')
@@ -772,7 +1012,7 @@ def rearrange_tiles(image, convert_dict):
 
         # Reload to update image
         image.reload()
-        image.save()
+        save_udim_image(image)
 
         # Repack image
         if ori_packed:
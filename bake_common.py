@@ -1,4 +1,4 @@
-import bpy, time, os, numpy
+import bpy, bmesh, time, os, numpy, math, zlib, hashlib, json
 from .common import *
 from .node_connections import *
 from . import lib, Layer, ImageAtlas, UDIM
@@ -348,6 +348,9 @@ def prepare_bake_settings(book, objs, yp=None, samples=1, margin=5, uv_map='', b
     scene = bpy.context.scene
     ypui = bpy.context.window_manager.ypui
 
+    # Deferred tree updates should be done before baking
+    if yp: flush_tree_update_batch(yp.id_data)
+
     scene.render.engine = 'CYCLES'
     scene.cycles.samples = samples
     scene.render.threads_mode = 'AUTO'
@@ -702,7 +705,115 @@ def recover_bake_settings(book, yp=None, recover_active_uv=False, mat=None):
                 #act_uv = m.node_tree.nodes.get(ACTIVE_UV_NODE)
                 #if act_uv: m.node_tree.nodes.remove(act_uv)
 
-def blur_image(image, alpha_aware=True, factor=1.0, samples=512, bake_device='GPU'):
+def box_blur_axis(arr, radius, axis):
+    if radius < 1: return arr
+
+    # Running sum over edge padded array
+    pad = [(0, 0)] * arr.ndim
+    pad[axis] = (radius + 1, radius)
+    csum = numpy.cumsum(numpy.pad(arr, pad, mode='edge'), axis=axis, dtype=numpy.float64)
+
+    size = arr.shape[axis]
+    upper = [slice(None)] * arr.ndim
+    lower = [slice(None)] * arr.ndim
+    upper[axis] = slice(2 * radius + 1, 2 * radius + 1 + size)
+    lower[axis] = slice(0, size)
+    upper = csum[tuple(upper)]
+    lower = csum[tuple(lower)]
+
+    return ((upper - lower) / (2 * radius + 1)).astype(numpy.float32)
+
+def get_gaussian_box_radii(sigma, num_boxes=3):
+    # Box sizes to approximate gaussian blur using several box blurs
+    if sigma <= 0.0: return [0] * num_boxes
+
+    w_ideal = math.sqrt((12.0 * sigma * sigma / num_boxes) + 1.0)
+    wl = int(math.floor(w_ideal))
+    if wl % 2 == 0: wl -= 1
+    wu = wl + 2
+
+    m_ideal = (12.0 * sigma * sigma - num_boxes * wl * wl - 4.0 * num_boxes * wl - 3.0 * num_boxes) / (-4.0 * wl - 4.0)
+    m = int(round(m_ideal))
+
+    return [(wl if i < m else wu) // 2 for i in range(num_boxes)]
+
+def blur_pixels(pxs, radius_x, radius_y, alpha_aware=True, blur_type='GAUSSIAN'):
+    # Blur pixels with shape (height, width, 4) using separable filters
+
+    if blur_type == 'BOX':
+        radii_x = [int(round(radius_x))]
+        radii_y = [int(round(radius_y))]
+    else:
+        # Half of the radius is roughly the deviation of random offsets inside a disk
+        radii_x = get_gaussian_box_radii(radius_x / 2.0)
+        radii_y = get_gaussian_box_radii(radius_y / 2.0)
+
+    # Premultiply so transparent pixels won't bleed their color
+    if alpha_aware:
+        alpha = pxs[..., 3:4].copy()
+        pxs[..., :3] *= alpha
+
+    # Blur channel by channel to limit memory usage
+    for i in range(4):
+        channel = pxs[..., i]
+        for r in radii_x:
+            channel = box_blur_axis(channel, r, 1)
+        for r in radii_y:
+            channel = box_blur_axis(channel, r, 0)
+        pxs[..., i] = channel
+
+    if alpha_aware:
+        alpha = pxs[..., 3:4]
+        rgb = pxs[..., :3]
+        numpy.divide(rgb, alpha, out=rgb, where=alpha > 0.0)
+
+    return pxs
+
+def blur_image_numpy(image, alpha_aware=True, factor=1.0, blur_type='GAUSSIAN', segment=None):
+    T = time.time()
+    print('BLUR: Doing Blur pass on', image.name + '...')
+
+    # Read segment rectangle on main thread since tiles can be processed on worker threads
+    rect = None
+    if segment:
+        rect = (segment.width * segment.tile_x, segment.height * segment.tile_y, segment.width, segment.height)
+
+    def blur_tile(tilenum, pxs_list):
+        pxs = pxs_list[0]
+
+        # Only blur inside the segment
+        if rect:
+            start_x, start_y, seg_width, seg_height = rect
+            region = pxs[start_y:start_y+seg_height, start_x:start_x+seg_width]
+        else: region = pxs
+
+        # Blur factor is percentage of the image size
+        height, width = region.shape[:2]
+        region[:] = blur_pixels(region, width * factor / 100.0, height * factor / 100.0, alpha_aware, blur_type)
+
+        return [pxs]
+
+    if image.source == 'TILED':
+        # Process all tiles in parallel
+        tilenums = [tile.number for tile in image.tiles]
+        UDIM.process_tiles([image], tilenums, blur_tile)
+    else:
+        pxs = get_image_pixels_mirror(image)
+        set_image_pixels_mirror(image, blur_tile(1001, [pxs])[0])
+
+    print('BLUR:', image.name, 'blur pass is done at', '{:0.2f}'.format(time.time() - T), 'seconds!')
+
+    return image
+
+def blur_image(image, alpha_aware=True, factor=1.0, samples=512, bake_device='GPU', use_numpy=None, blur_type='GAUSSIAN', segment=None):
+
+    # Use blur backend from preferences if not specified
+    if use_numpy == None:
+        use_numpy = get_user_preferences().blur_backend == 'NUMPY'
+
+    if use_numpy and is_greater_than_283():
+        return blur_image_numpy(image, alpha_aware, factor, blur_type, segment)
+
     T = time.time()
     print('FXAA: Doing Blur pass on', image.name + '...')
     book = remember_before_bake()
@@ -756,11 +867,8 @@ def blur_image(image, alpha_aware=True, factor=1.0, samples=512, bake_device='GP
         tilenums = [tile.number for tile in image.tiles]
     else: tilenums = [1001]
 
-    for tilenum in tilenums:
-
-        # Swap tile to 1001 to access the data
-        if tilenum != 1001:
-            UDIM.swap_tile(image, 1001, tilenum)
+    # Tile data will be accessible from tile 1001
+    for tilenum in UDIM.iterate_tiles([image], tilenums):
 
         width = image.size[0]
         height = image.size[1]
@@ -791,10 +899,6 @@ def blur_image(image, alpha_aware=True, factor=1.0, samples=512, bake_device='GP
             # TODO: Copy result to main image
             #copy_image_channel_pixels(image_copy, image, 3, 3)
 
-        # Swap back the tile
-        if tilenum != 1001:
-            UDIM.swap_tile(image, 1001, tilenum)
-
         # Remove temp images
         bpy.data.images.remove(image_copy)
 
@@ -823,7 +927,150 @@ def blur_image(image, alpha_aware=True, factor=1.0, samples=512, bake_device='GP
 
     return image
 
+FXAA_SPAN_MAX = 8.0
+FXAA_REDUCE_MUL = 1.0 / 8.0
+FXAA_REDUCE_MIN = 1.0 / 128.0
+
+def sample_pixels_bilinear(pxs, xs, ys):
+    height, width = pxs.shape[:2]
+
+    # Clamp to image border
+    xs = numpy.clip(xs, 0, width - 1)
+    ys = numpy.clip(ys, 0, height - 1)
+
+    x0 = numpy.floor(xs).astype(numpy.int32)
+    y0 = numpy.floor(ys).astype(numpy.int32)
+    x1 = numpy.minimum(x0 + 1, width - 1)
+    y1 = numpy.minimum(y0 + 1, height - 1)
+
+    fx = (xs - x0)[..., None]
+    fy = (ys - y0)[..., None]
+
+    bottom = pxs[y0, x0] * (1.0 - fx) + pxs[y0, x1] * fx
+    top = pxs[y1, x0] * (1.0 - fx) + pxs[y1, x1] * fx
+
+    return bottom * (1.0 - fy) + top * fy
+
+def fxaa_pixels(pxs, chunk_rows=256):
+    # Apply FXAA on rgb channels of pixels with shape (height, width, 4)
+    height, width = pxs.shape[:2]
+
+    rgb = numpy.ascontiguousarray(pxs[..., :3])
+    luma_weights = numpy.array([0.299, 0.587, 0.114], dtype=numpy.float32)
+    luma = rgb @ luma_weights
+    luma_pad = numpy.pad(luma, 1, mode='edge')
+
+    result = numpy.empty_like(rgb)
+
+    # Process image by chunk of rows to limit memory usage
+    for start in range(0, height, chunk_rows):
+        end = min(height, start + chunk_rows)
+
+        # Diagonal neighbors, pixel rows go from bottom to top
+        luma_m = luma[start:end]
+        luma_nw = luma_pad[start+2:end+2, 0:width]
+        luma_ne = luma_pad[start+2:end+2, 2:width+2]
+        luma_sw = luma_pad[start:end, 0:width]
+        luma_se = luma_pad[start:end, 2:width+2]
+
+        luma_min = numpy.minimum.reduce([luma_m, luma_nw, luma_ne, luma_sw, luma_se])
+        luma_max = numpy.maximum.reduce([luma_m, luma_nw, luma_ne, luma_sw, luma_se])
+
+        # Edge direction
+        dir_x = -((luma_nw + luma_ne) - (luma_sw + luma_se))
+        dir_y = (luma_nw + luma_sw) - (luma_ne + luma_se)
+
+        dir_reduce = numpy.maximum((luma_nw + luma_ne + luma_sw + luma_se) * (0.25 * FXAA_REDUCE_MUL), FXAA_REDUCE_MIN)
+        rcp_dir_min = 1.0 / (numpy.minimum(numpy.abs(dir_x), numpy.abs(dir_y)) + dir_reduce)
+
+        dir_x = numpy.clip(dir_x * rcp_dir_min, -FXAA_SPAN_MAX, FXAA_SPAN_MAX)
+        dir_y = numpy.clip(dir_y * rcp_dir_min, -FXAA_SPAN_MAX, FXAA_SPAN_MAX)
+
+        ys, xs = numpy.mgrid[start:end, 0:width].astype(numpy.float32)
+
+        rgb_a = 0.5 * (
+                sample_pixels_bilinear(rgb, xs + dir_x * (1.0/3.0 - 0.5), ys + dir_y * (1.0/3.0 - 0.5)) +
+                sample_pixels_bilinear(rgb, xs + dir_x * (2.0/3.0 - 0.5), ys + dir_y * (2.0/3.0 - 0.5)))
+
+        rgb_b = rgb_a * 0.5 + 0.25 * (
+                sample_pixels_bilinear(rgb, xs - dir_x * 0.5, ys - dir_y * 0.5) +
+                sample_pixels_bilinear(rgb, xs + dir_x * 0.5, ys + dir_y * 0.5))
+
+        luma_b = rgb_b @ luma_weights
+        outside = ((luma_b < luma_min) | (luma_b > luma_max))[..., None]
+
+        result[start:end] = numpy.where(outside, rgb_a, rgb_b)
+
+    pxs[..., :3] = result
+
+    return pxs
+
+def dilate_transparent_pixels(pxs, iterations=int(FXAA_SPAN_MAX)):
+    # Fill color of fully transparent pixels with the average color of their filled neighbors,
+    # so filters won't pull dark color from transparent area (same purpose as the straight over bake pass)
+    rgb = pxs[..., :3]
+    filled = pxs[..., 3] > 0.0
+    if filled.all() or not filled.any(): return pxs
+
+    for i in range(iterations):
+        weight = filled.astype(numpy.float32)
+        col = rgb * weight[..., None]
+
+        col_sum = numpy.zeros_like(col)
+        weight_sum = numpy.zeros_like(weight)
+
+        col_sum[1:] += col[:-1]
+        col_sum[:-1] += col[1:]
+        col_sum[:, 1:] += col[:, :-1]
+        col_sum[:, :-1] += col[:, 1:]
+
+        weight_sum[1:] += weight[:-1]
+        weight_sum[:-1] += weight[1:]
+        weight_sum[:, 1:] += weight[:, :-1]
+        weight_sum[:, :-1] += weight[:, 1:]
+
+        new = ~filled & (weight_sum > 0.0)
+        if not new.any(): break
+
+        rgb[new] = col_sum[new] / weight_sum[new][..., None]
+        filled |= new
+
+    return pxs
+
+def fxaa_image_numpy(image, alpha_aware=True, first_tile_only=False):
+    T = time.time()
+    print('FXAA: Doing FXAA pass on', image.name + '...')
+
+    def fxaa_tile(tilenum, pxs_list):
+        pxs = pxs_list[0]
+
+        # Alpha aware FXAA works on dilated straight color and keeps original alpha,
+        # otherwise result will be fully opaque like the baked result
+        if alpha_aware:
+            dilate_transparent_pixels(pxs)
+        fxaa_pixels(pxs)
+        if not alpha_aware:
+            pxs[..., 3] = 1.0
+
+        return [pxs]
+
+    if image.source == 'TILED' and not first_tile_only:
+        # Process all tiles in parallel
+        tilenums = [tile.number for tile in image.tiles]
+        UDIM.process_tiles([image], tilenums, fxaa_tile)
+    else:
+        pxs = get_image_pixels_mirror(image)
+        set_image_pixels_mirror(image, fxaa_tile(1001, [pxs])[0])
+
+    print('FXAA:', image.name, 'FXAA pass is done at', '{:0.2f}'.format(time.time() - T), 'seconds!')
+
+    return image
+
 def fxaa_image(image, alpha_aware=True, bake_device='GPU', first_tile_only=False):
+    # Use numpy implementation if possible since it's much faster than baking
+    if is_greater_than_283():
+        return fxaa_image_numpy(image, alpha_aware, first_tile_only)
+
     T = time.time()
     print('FXAA: Doing FXAA pass on', image.name + '...')
     book = remember_before_bake()
@@ -864,11 +1111,8 @@ def fxaa_image(image, alpha_aware=True, bake_device='GPU', first_tile_only=False
         tilenums = [tile.number for tile in image.tiles]
     else: tilenums = [1001]
 
-    for tilenum in tilenums:
-
-        # Swap tile to 1001 to access the data
-        if tilenum != 1001:
-            UDIM.swap_tile(image, 1001, tilenum)
+    # Tile data will be accessible from tile 1001
+    for tilenum in UDIM.iterate_tiles([image], tilenums):
 
         width = image.size[0]
         height = image.size[1]
@@ -931,10 +1175,6 @@ def fxaa_image(image, alpha_aware=True, bake_device='GPU', first_tile_only=False
             print('FXAA: Copying original alpha to FXAA result of', image.name + '...')
             copy_image_channel_pixels(image_ori, image, 3, 3)
 
-        # Swap back the tile
-        if tilenum != 1001:
-            UDIM.swap_tile(image, 1001, tilenum)
-
         # Remove temp images
         bpy.data.images.remove(image_copy)
         if image_ori : bpy.data.images.remove(image_ori)
@@ -967,6 +1207,9 @@ def fxaa_image(image, alpha_aware=True, bake_device='GPU', first_tile_only=False
 
 def bake_to_vcol(mat, node, root_ch, extra_channel=None, extra_multiplier=1.0):
 
+    # Make sure the tree is not waiting for deferred updates
+    flush_tree_update_batch(node.node_tree)
+
     # Create setup nodes
     emit = mat.node_tree.nodes.new('ShaderNodeEmission')
 
@@ -1036,16 +1279,466 @@ def get_valid_filepath(img, use_hdr):
 
     return img.filepath
 
-def bake_channel(uv_map, mat, node, root_ch, width=1024, height=1024, target_layer=None, use_hdr=False, aa_level=1):
+# Background bake job state, mode can be 'SAVE' (inside worker process) or 'LOAD' (applying worker results)
+# Saved contains result files of the channel being baked, missing contains results that failed to load
+_bake_job = {'mode': None, 'dir': '', 'saved': [], 'missing': []}
+
+def set_bake_job(mode=None, directory=''):
+    _bake_job['mode'] = mode
+    _bake_job['dir'] = directory
+    _bake_job['saved'] = []
+    _bake_job['missing'] = []
+
+def get_bake_job_mode():
+    return _bake_job['mode']
+
+def get_bake_job_dir():
+    return _bake_job['dir']
+
+def get_bake_job_filepath(root_ch, role):
+    return os.path.join(_bake_job['dir'], str(get_channel_index(root_ch)) + '_' + role + '.npy')
+
+def get_bake_job_manifest_path(directory, root_ch):
+    return os.path.join(directory, str(get_channel_index(root_ch)) + '_manifest.json')
+
+def write_bake_job_manifest(root_ch, fingerprint, skipped=False):
+    # Manifest tells the main process which results belong to the channel
+    # and the fingerprint of the state the worker baked from
+    manifest = {
+            'channel' : root_ch.name,
+            'fingerprint' : fingerprint,
+            'skipped' : skipped,
+            'files' : _bake_job['saved'],
+            }
+
+    with open(get_bake_job_manifest_path(_bake_job['dir'], root_ch), 'w') as f:
+        json.dump(manifest, f)
+
+    _bake_job['saved'] = []
+
+def read_bake_job_manifest(directory, root_ch):
+    path = get_bake_job_manifest_path(directory, root_ch)
+    if not os.path.isfile(path): return None
+
+    try: 
+        with open(path) as f:
+            manifest = json.load(f)
+    except Exception as e:
+        print(e)
+        return None
+
+    # Channel can be reordered while the worker is running
+    if manifest.get('channel') != root_ch.name: return None
+
+    return manifest
+
+def get_bake_job_missing_results():
+    return list(_bake_job['missing'])
+
+def bake_channel_image(image, root_ch, role):
+    mode = _bake_job['mode']
+    can_use_pixels = image.source != 'TILED' and is_greater_than_283()
+
+    # Use pixels baked by background worker, never bake on the main process in this mode
+    if mode == 'LOAD':
+        path = get_bake_job_filepath(root_ch, role)
+        if can_use_pixels and os.path.isfile(path):
+            pxs = numpy.load(path)
+            if len(pxs) == len(image.pixels):
+                image.pixels.foreach_set(pxs)
+                return
+
+        print('BAKE CHANNEL: Background bake result of', root_ch.name, role.lower(), 'is not found!')
+        _bake_job['missing'].append(root_ch.name + ' ' + role.lower())
+        return
+
+    bpy.ops.object.bake()
+
+    # Store raw bake result so main process can load it
+    if mode == 'SAVE' and can_use_pixels:
+        pxs = numpy.empty(shape=len(image.pixels), dtype=numpy.float32)
+        image.pixels.foreach_get(pxs)
+        path = get_bake_job_filepath(root_ch, role)
+        numpy.save(path, pxs)
+        _bake_job['saved'].append(os.path.basename(path))
+
+def prepare_bake_channel_session(mat, uv_map, objs=None):
+    # Bake session contains setups that can be shared when baking multiple channels
+    session = {}
+    session['mat'] = mat
+
+    # Check if udim image is needed based on number of tiles
+    if objs == None:
+        objs = get_all_objects_with_same_materials(mat)
+    session['tilenums'] = UDIM.get_tile_numbers(objs, uv_map)
+
+    # Create setup nodes
+    session['tex'] = mat.node_tree.nodes.new('ShaderNodeTexImage')
+    session['emit'] = mat.node_tree.nodes.new('ShaderNodeEmission')
+    session['norm'] = None
+
+    # Get output node and remember original bsdf input
+    output = session['output'] = get_active_mat_output_node(mat.node_tree)
+    session['ori_bsdf'] = output.inputs[0].links[0].from_socket
+
+    # Connect emit to output material
+    mat.node_tree.links.new(session['emit'].outputs[0], output.inputs[0])
+
+    return session
+
+def get_bake_channel_session_normal_node(session):
+    # Normal bake node is only created when there's normal channel to bake
+    if not session['norm']:
+        norm = session['norm'] = session['mat'].node_tree.nodes.new('ShaderNodeGroup')
+        if is_greater_than_280 and not is_greater_than_300():
+            norm.node_tree = get_node_tree_lib(lib.BAKE_NORMAL_ACTIVE_UV)
+        else: norm.node_tree = get_node_tree_lib(lib.BAKE_NORMAL_ACTIVE_UV_300)
+
+    return session['norm']
+
+def recover_bake_channel_session(session):
+    mat = session['mat']
+
+    simple_remove_node(mat.node_tree, session['tex'])
+    simple_remove_node(mat.node_tree, session['emit'])
+    if session['norm']:
+        simple_remove_node(mat.node_tree, session['norm'])
+
+    # Recover original bsdf
+    mat.node_tree.links.new(session['ori_bsdf'], session['output'].inputs[0])
+
+# Properties that only affect UI and should not invalidate bake fingerprint
+FINGERPRINT_SKIPPED_PROPS = {'rna_type', 'name', 'select', 'location', 'width', 'height', 'dimensions', 'hide', 'label', 'parent', 'no_layer_using'}
+FINGERPRINT_SKIPPED_PREFIXES = ('expand_', 'show_', 'active_', 'halt_')
+
+# Root properties of yp that affect the baked result
+YP_FINGERPRINT_PROPS = ['enable_backface_always_up', 'enable_tangent_sign_hacks', 'preview_mode', 'layer_preview_mode', 'layer_preview_mode_type']
+
+def get_rna_fingerprint(struct, memo, depth=0):
+    items = []
+
+    for prop in struct.bl_rna.properties:
+        pid = prop.identifier
+        if pid in FINGERPRINT_SKIPPED_PROPS or pid.startswith(FINGERPRINT_SKIPPED_PREFIXES): continue
+
+        try: val = getattr(struct, pid)
+        except: continue
+
+        if prop.type == 'POINTER':
+            if val == None:
+                items.append((pid, None))
+            elif isinstance(val, bpy.types.Image):
+                items.append((pid, get_image_fingerprint(val, memo)))
+            elif isinstance(val, bpy.types.NodeTree):
+                items.append((pid, get_node_tree_fingerprint(val, memo)))
+            elif isinstance(val, bpy.types.ID):
+                items.append((pid, val.name))
+            elif depth < 3:
+                items.append((pid, get_rna_fingerprint(val, memo, depth+1)))
+
+        elif prop.type == 'COLLECTION':
+            if depth < 3:
+                items.append((pid, [get_rna_fingerprint(v, memo, depth+1) for v in val]))
+
+        elif getattr(prop, 'is_array', False):
+            items.append((pid, tuple(val)))
+
+        else: items.append((pid, val))
+
+    return str(items)
+
+def get_image_fingerprint(image, memo):
+    key = 'IMAGE:' + image.name
+    if key in memo: return memo[key]
+
+    # Use absolute path since background bake worker runs on a copy of the blend file saved on another directory
+    items = [image.name, image.source, os.path.normpath(bpy.path.abspath(image.filepath)), tuple(image.size), image.is_float, image.colorspace_settings.name]
+
+    if image.is_dirty:
+        # Painted image can only be checked by its pixels
+        if image.source != 'TILED' and is_greater_than_283():
+            pxs = numpy.empty(shape=len(image.pixels), dtype=numpy.float32)
+            image.pixels.foreach_get(pxs)
+            items.append(zlib.adler32(pxs.tobytes()))
+
+        # Always treat dirty udim image as changed
+        else: items.append(time.time())
+
+    elif image.packed_file:
+        items.append(zlib.adler32(image.packed_file.data))
+
+    elif image.source == 'GENERATED':
+        items.extend([image.generated_type, tuple(image.generated_color), image.use_generated_float])
+
+    else:
+        path = bpy.path.abspath(image.filepath)
+        items.append(os.path.getmtime(path) if os.path.isfile(path) else None)
+
+    fingerprint = memo[key] = str(items)
+    return fingerprint
+
+def get_node_fingerprint(n, memo):
+    base_props = {p.identifier for p in bpy.types.Node.bl_rna.properties}
+
+    items = [n.name, n.bl_idname, n.mute]
+
+    for prop in n.bl_rna.properties:
+        if prop.identifier in base_props: continue
+        val = getattr(n, prop.identifier)
+        if prop.type == 'POINTER':
+            if isinstance(val, bpy.types.Image):
+                items.append(get_image_fingerprint(val, memo))
+            elif isinstance(val, bpy.types.NodeTree):
+                items.append(get_node_tree_fingerprint(val, memo))
+            elif isinstance(val, bpy.types.ID):
+                items.append(val.name)
+            elif val != None:
+                items.append(get_rna_fingerprint(val, memo, 1))
+        elif prop.type == 'COLLECTION': continue
+        elif getattr(prop, 'is_array', False):
+            items.append(tuple(val))
+        else: items.append(val)
+
+    for inp in n.inputs:
+        if hasattr(inp, 'default_value'):
+            val = inp.default_value
+            items.append(tuple(val) if hasattr(val, '__len__') and not isinstance(val, str) else val)
+
+    return items
+
+def get_upstream_nodes_fingerprint(node, memo):
+    # Material nodes connected to the inputs of the node can also change the bake result
+    tree = node.id_data
+
+    links_to = {}
+    for l in tree.links:
+        links_to.setdefault(l.to_node.name, []).append(l)
+
+    items = []
+    visited = {node.name}
+    queue = [node]
+    while queue:
+        n = queue.pop(0)
+        for l in sorted(links_to.get(n.name, []), key=lambda l: l.to_socket.identifier):
+            items.append((l.from_node.name, l.from_socket.identifier, l.to_node.name, l.to_socket.identifier, l.is_muted if hasattr(l, 'is_muted') else False))
+            if l.from_node.name in visited: continue
+            visited.add(l.from_node.name)
+            items.append(get_node_fingerprint(l.from_node, memo))
+            queue.append(l.from_node)
+
+    return str(items)
+
+def get_node_tree_fingerprint(tree, memo):
+    key = 'TREE:' + tree.name
+    if key in memo: return memo[key]
+
+    # Mark the tree first to avoid infinite recursion
+    memo[key] = key
+
+    items = [get_node_fingerprint(n, memo) for n in tree.nodes]
+
+    for l in tree.links:
+        items.append((l.from_node.name, l.from_socket.identifier, l.to_node.name, l.to_socket.identifier))
+
+    fingerprint = memo[key] = hashlib.md5(str(items).encode()).hexdigest()
+    return fingerprint
+
+# Foreach field, number of values and numpy type for each attribute data type
+ATTRIBUTE_FOREACH_FIELDS = {
+        'FLOAT' : ('value', 1, numpy.float32),
+        'INT' : ('value', 1, numpy.int32),
+        'INT8' : ('value', 1, numpy.int32),
+        'BOOLEAN' : ('value', 1, bool),
+        'FLOAT2' : ('vector', 2, numpy.float32),
+        'FLOAT_VECTOR' : ('vector', 3, numpy.float32),
+        'FLOAT_COLOR' : ('color', 4, numpy.float32),
+        'BYTE_COLOR' : ('color', 4, numpy.float32),
+        }
+
+def get_foreach_checksum(collection, field, size, dtype=numpy.float32):
+    arr = numpy.empty(len(collection) * size, dtype=dtype)
+    collection.foreach_get(field, arr)
+    return zlib.adler32(arr.tobytes())
+
+def get_attribute_checksums(mesh):
+    items = []
+
+    # Generic attributes, including the ones generated by geometry nodes
+    if hasattr(mesh, 'attributes'):
+        for attr in mesh.attributes:
+            field = ATTRIBUTE_FOREACH_FIELDS.get(attr.data_type)
+            if field:
+                items.append((attr.name, attr.domain, get_foreach_checksum(attr.data, *field)))
+
+    return items
+
+def get_evaluated_mesh_fingerprint(obj):
+    # Evaluated mesh covers geometry nodes inputs, drivers, animation, and deformation from other objects
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    obj_eval = obj.evaluated_get(depsgraph)
+    mesh = obj_eval.to_mesh()
+    if not mesh: return None
+
+    try:
+        items = [get_foreach_checksum(mesh.vertices, 'co', 3)]
+        items.append(get_foreach_checksum(mesh.loops, 'vertex_index', 1, numpy.int32))
+        items.append(get_foreach_checksum(mesh.polygons, 'material_index', 1, numpy.int32))
+
+        for uvl in mesh.uv_layers:
+            items.append((uvl.name, get_foreach_checksum(uvl.data, 'uv', 2)))
+
+        items.extend(get_attribute_checksums(mesh))
+
+    finally: obj_eval.to_mesh_clear()
+
+    return items
+
+def get_modifier_dependency_transforms(obj):
+    # Transform of objects used by modifiers, like armature, hook, or boolean target
+    items = []
+    for m in obj.modifiers:
+        for prop in m.bl_rna.properties:
+            if prop.type != 'POINTER': continue
+            val = getattr(m, prop.identifier)
+            if isinstance(val, bpy.types.Object):
+                items.append((m.name, val.name, [tuple(r) for r in val.matrix_world]))
+
+    return items
+
+def get_mesh_fingerprint(obj, memo=None):
+    if memo == None: memo = {}
+    mesh = obj.data
+    if obj.mode == 'EDIT':
+        obj.update_from_editmode()
+
+    items = [obj.name, mesh.name, [tuple(r) for r in obj.matrix_world]]
+    items.append([get_rna_fingerprint(m, memo, 2) for m in obj.modifiers])
+    items.append(get_modifier_dependency_transforms(obj))
+
+    if is_greater_than_280():
+        items.append(get_evaluated_mesh_fingerprint(obj))
+
+    if mesh.shape_keys:
+        items.append([(kb.name, kb.value, kb.mute) for kb in mesh.shape_keys.key_blocks])
+
+    items.append(get_foreach_checksum(mesh.vertices, 'co', 3))
+    items.append(get_foreach_checksum(mesh.loops, 'vertex_index', 1, numpy.int32))
+    items.append(get_foreach_checksum(mesh.polygons, 'material_index', 1, numpy.int32))
+
+    for uvl in get_uv_layers(obj):
+        items.append((uvl.name, get_foreach_checksum(uvl.data, 'uv', 2)))
+
+    for vcol in get_vertex_colors(obj):
+        items.append((vcol.name, get_foreach_checksum(vcol.data, 'color', 4)))
+
+    items.extend(get_attribute_checksums(mesh))
+
+    return str(items)
+
+def get_bake_channel_fingerprint(node, root_ch, objs, uv_map, settings, memo):
+    yp = node.node_tree.yp
+    ch_idx = get_channel_index(root_ch)
+
+    items = [settings, get_rna_fingerprint(root_ch, memo)]
+
+    # Root yp settings and uvs are shared by all channels
+    key = 'YP:' + node.node_tree.name
+    if key not in memo:
+        memo[key] = str([(prop, getattr(yp, prop)) for prop in YP_FINGERPRINT_PROPS] + [uv.name for uv in yp.uvs])
+    items.append(memo[key])
+
+    # Group node input value will be used if no layer covering it
+    inp = node.inputs.get(root_ch.name)
+    if inp and hasattr(inp, 'default_value'):
+        val = inp.default_value
+        items.append(tuple(val) if hasattr(val, '__len__') else val)
+
+    # Material nodes plugged into the group inputs
+    key = 'UPSTREAM:' + node.name
+    if key not in memo:
+        memo[key] = get_upstream_nodes_fingerprint(node, memo)
+    items.append(memo[key])
+
+    # Only layers using this channel are affecting the result
+    for layer in yp.layers:
+        items.append((layer.name, layer.enable, layer.parent_idx, layer.channels[ch_idx].enable))
+        if not layer.enable or not layer.channels[ch_idx].enable: continue
+
+        key = 'LAYER:' + layer.name
+        if key not in memo:
+            layer_items = [get_rna_fingerprint(layer, memo)]
+            layer_tree = get_tree(layer)
+            if layer_tree:
+                layer_items.append(get_node_tree_fingerprint(layer_tree, memo))
+            memo[key] = str(layer_items)
+
+        items.append(memo[key])
+
+    for obj in objs:
+        key = 'MESH:' + obj.name
+        if key not in memo:
+            memo[key] = get_mesh_fingerprint(obj, memo)
+        items.append(memo[key])
+
+    return hashlib.md5(str(items).encode()).hexdigest()
+
+def get_image_sizes(image):
+    if image.source == 'TILED':
+        return [tuple(tile.size) for tile in image.tiles]
+    return [tuple(image.size)]
+
+def get_baked_image_fingerprint(image, fingerprint):
+    # Baked image content is also part of the fingerprint, so painted or edited result will be baked again
+    items = [fingerprint, get_image_sizes(image)]
+
+    if image.source != 'TILED' and is_greater_than_283():
+        pxs = numpy.empty(shape=len(image.pixels), dtype=numpy.float32)
+        image.pixels.foreach_get(pxs)
+        items.append(zlib.adler32(pxs.tobytes()))
+
+    # Udim pixels can only be checked from its tile files, so treat dirty udim image as edited
+    elif image.is_dirty:
+        return ''
+
+    return hashlib.md5(str(items).encode()).hexdigest()
+
+def is_baked_channel_up_to_date(tree, root_ch, fingerprint, width, height):
+    # Baked images should exist, have requested size, and still have the same fingerprint
+    baked_images = []
+
+    baked = tree.nodes.get(root_ch.baked)
+    if not baked or not baked.image: return False
+    baked_images.append(baked.image)
+
+    if root_ch.type == 'NORMAL':
+        baked_disp = tree.nodes.get(root_ch.baked_disp)
+        if not baked_disp or not baked_disp.image: return False
+        baked_images.append(baked_disp.image)
+
+    for img in baked_images:
+        if any(size != (width, height) for size in get_image_sizes(img)): return False
+        if img.y_bake_info.bake_fingerprint == '': return False
+        if img.y_bake_info.bake_fingerprint != get_baked_image_fingerprint(img, fingerprint): return False
+
+    return True
+
+def set_baked_channel_fingerprint(tree, root_ch, fingerprint):
+    for prop in ['baked', 'baked_disp', 'baked_normal_overlay']:
+        baked = tree.nodes.get(getattr(root_ch, prop))
+        if baked and baked.image:
+            if fingerprint != '':
+                baked.image.y_bake_info.bake_fingerprint = get_baked_image_fingerprint(baked.image, fingerprint)
+            else: baked.image.y_bake_info.bake_fingerprint = ''
+
+def bake_channel(uv_map, mat, node, root_ch, width=1024, height=1024, target_layer=None, use_hdr=False, aa_level=1, session=None):
 
     print('BAKE CHANNEL: Baking', root_ch.name + ' channel...')
 
     tree = node.node_tree
     yp = tree.yp
 
-    # Check if udim image is needed based on number of tiles
-    objs = get_all_objects_with_same_materials(mat)
-    tilenums = UDIM.get_tile_numbers(objs, uv_map)
+    # Make sure the tree is not waiting for deferred updates
+    flush_tree_update_batch(tree)
 
     # Check if temp bake is necessary
     #temp_baked = []
@@ -1083,27 +1776,21 @@ def bake_channel(uv_map, mat, node, root_ch, width=1024, height=1024, target_lay
 
         ch = target_layer.channels[get_channel_index(root_ch)]
 
-    # Create setup nodes
-    tex = mat.node_tree.nodes.new('ShaderNodeTexImage')
-    emit = mat.node_tree.nodes.new('ShaderNodeEmission')
+    # Create setup nodes if there's no bake session shared between channels
+    own_session = session == None
+    if own_session:
+        session = prepare_bake_channel_session(mat, uv_map)
 
-    if root_ch.type == 'NORMAL':
+    tilenums = session['tilenums']
+    tex = session['tex']
+    emit = session['emit']
 
-        norm = mat.node_tree.nodes.new('ShaderNodeGroup')
-        if is_greater_than_280 and not is_greater_than_300():
-            norm.node_tree = get_node_tree_lib(lib.BAKE_NORMAL_ACTIVE_UV)
-        else: norm.node_tree = get_node_tree_lib(lib.BAKE_NORMAL_ACTIVE_UV_300)
+    if root_ch.type == 'NORMAL':
+        norm = get_bake_channel_session_normal_node(session)
 
     # Set tex as active node
     mat.node_tree.nodes.active = tex
 
-    # Get output node and remember original bsdf input
-    output = get_active_mat_output_node(mat.node_tree)
-    ori_bsdf = output.inputs[0].links[0].from_socket
-
-    # Connect emit to output material
-    mat.node_tree.links.new(emit.outputs[0], output.inputs[0])
-
     # Image name
     if segment:
         img_name = '__TEMP_SEGMENT_'
@@ -1256,7 +1943,7 @@ def bake_channel(uv_map, mat, node, root_ch, width=1024, height=1024, target_lay
 
         # Bake!
         print('BAKE CHANNEL: Baking main image of ' + root_ch.name + ' channel...')
-        bpy.ops.object.bake()
+        bake_channel_image(img, root_ch, 'MAIN')
 
     # Bake displacement
     if root_ch.type == 'NORMAL':
@@ -1309,7 +1996,7 @@ def bake_channel(uv_map, mat, node, root_ch, width=1024, height=1024, target_lay
 
                 # Bake
                 print('BAKE CHANNEL: Baking normal overlay image of ' + root_ch.name + ' channel...')
-                bpy.ops.object.bake()
+                bake_channel_image(norm_img, root_ch, 'OVERLAY')
 
                 #return
 
@@ -1385,7 +2072,7 @@ def bake_channel(uv_map, mat, node, root_ch, width=1024, height=1024, target_lay
 
             # Bake
             print('BAKE CHANNEL: Baking displacement image of ' + root_ch.name + ' channel...')
-            bpy.ops.object.bake()
+            bake_channel_image(disp_img, root_ch, 'DISP')
 
             if not target_layer:
 
@@ -1419,23 +2106,10 @@ def bake_channel(uv_map, mat, node, root_ch, width=1024, height=1024, target_lay
 
         # Bake
         print('BAKE CHANNEL: Baking alpha of ' + root_ch.name + ' channel...')
-        bpy.ops.object.bake()
+        bake_channel_image(alpha_img, root_ch, 'ALPHA')
 
-        # Set tile pixels
-        for tilenum in tilenums:
-
-            # Swap tile
-            if tilenum != 1001:
-                UDIM.swap_tile(img, 1001, tilenum)
-                UDIM.swap_tile(alpha_img, 1001, tilenum)
-
-            # Copy alpha
-            copy_image_channel_pixels(alpha_img, img, 0, 3)
-
-            # Swap tile again to recover
-            if tilenum != 1001:
-                UDIM.swap_tile(img, 1001, tilenum)
-                UDIM.swap_tile(alpha_img, 1001, tilenum)
+        # Copy alpha
+        UDIM.copy_tiles_channel_pixels(alpha_img, img, tilenums, 0, 3)
 
         # Remove temp image
         bpy.data.images.remove(alpha_img)
@@ -1451,15 +2125,9 @@ def bake_channel(uv_map, mat, node, root_ch, width=1024, height=1024, target_lay
         else:
             baked.image = img
 
-    simple_remove_node(mat.node_tree, tex)
-    simple_remove_node(mat.node_tree, emit)
-    #simple_remove_node(mat.node_tree, lin2srgb)
-    #simple_remove_node(mat.node_tree, srgb2lin)
-    if root_ch.type == 'NORMAL':
-        simple_remove_node(mat.node_tree, norm)
-
-    # Recover original bsdf
-    mat.node_tree.links.new(ori_bsdf, output.inputs[0])
+    # Remove setup nodes and recover original bsdf
+    if own_session:
+        recover_bake_channel_session(session)
 
     # Recover baked temp
     #for ent in temp_baked:
@@ -1594,7 +2262,98 @@ def get_duplicated_mesh_objects(scene, objs, hide_original=False):
     print('INFO: Duplicating mesh(es) is done at', '{:0.2f}'.format(time.time() - tt), 'seconds!')
     return new_objs
 
-def get_merged_mesh_objects(scene, objs, hide_original=False):
+# Merged mesh cache, key is tuple of source object names and value is [fingerprint, bmesh, mesh settings]
+# Geometry is kept as bmesh, so the cache won't leave any orphan data on the blend file
+_merged_mesh_cache = {}
+MAX_MERGED_MESH_CACHE = 4
+
+def remove_merged_mesh_cache_entry(key):
+    entry = _merged_mesh_cache.pop(key, None)
+    if entry: entry[1].free()
+
+def clear_merged_mesh_cache():
+    for key in list(_merged_mesh_cache.keys()):
+        remove_merged_mesh_cache_entry(key)
+
+def get_merged_mesh_cache_fingerprint(objs):
+    memo = {}
+    return hashlib.md5(str([get_mesh_fingerprint(obj, memo) for obj in objs]).encode()).hexdigest()
+
+def get_cached_merged_mesh_object(scene, objs, fingerprint):
+    key = tuple(obj.name for obj in objs)
+    entry = _merged_mesh_cache.get(key)
+    if not entry: return None
+
+    # Geometry has changed
+    if entry[0] != fingerprint:
+        remove_merged_mesh_cache_entry(key)
+        return None
+
+    fingerprint, bm, settings = entry
+
+    mesh = bpy.data.meshes.new(objs[0].name + '_merged')
+    bm.to_mesh(mesh)
+    for name in settings['materials']:
+        mesh.materials.append(bpy.data.materials.get(name))
+    if hasattr(mesh, 'use_auto_smooth'):
+        mesh.use_auto_smooth = settings['use_auto_smooth']
+        mesh.auto_smooth_angle = settings['auto_smooth_angle']
+
+    # Object settings follow the first object like the uncached merge, but with all modifiers already applied
+    merged_obj = objs[0].copy()
+    merged_obj.data = mesh
+    merged_obj.name = objs[0].name + '_merged'
+    for m in reversed(list(merged_obj.modifiers)):
+        merged_obj.modifiers.remove(m)
+    for vg in reversed(list(merged_obj.vertex_groups)):
+        merged_obj.vertex_groups.remove(vg)
+    for name in settings['vertex_groups']:
+        merged_obj.vertex_groups.new(name=name)
+    link_object(scene, merged_obj)
+
+    try: bpy.ops.object.mode_set(mode = 'OBJECT')
+    except: pass
+    bpy.ops.object.select_all(action='DESELECT')
+    set_active_object(merged_obj)
+    set_object_select(merged_obj, True)
+
+    return merged_obj
+
+def set_cached_merged_mesh_object(objs, merged_obj, fingerprint):
+    key = tuple(obj.name for obj in objs)
+    remove_merged_mesh_cache_entry(key)
+
+    # Remove the oldest cache
+    while len(_merged_mesh_cache) >= MAX_MERGED_MESH_CACHE:
+        remove_merged_mesh_cache_entry(next(iter(_merged_mesh_cache)))
+
+    mesh = merged_obj.data
+    bm = bmesh.new()
+    bm.from_mesh(mesh)
+
+    settings = {
+            'materials' : [m.name if m else '' for m in mesh.materials],
+            'vertex_groups' : [vg.name for vg in merged_obj.vertex_groups],
+            'use_auto_smooth' : getattr(mesh, 'use_auto_smooth', False),
+            'auto_smooth_angle' : getattr(mesh, 'auto_smooth_angle', 0.0),
+            }
+
+    _merged_mesh_cache[key] = [fingerprint, bm, settings]
+
+def get_merged_mesh_objects(scene, objs, hide_original=False, use_cache=True):
+
+    # Reuse merged mesh if source objects haven't changed since the last merge
+    fingerprint = None
+    if use_cache:
+        objs = [obj for obj in objs if obj.type == 'MESH']
+        fingerprint = get_merged_mesh_cache_fingerprint(objs)
+        merged_obj = get_cached_merged_mesh_object(scene, objs, fingerprint)
+        if merged_obj:
+            if hide_original:
+                for obj in objs:
+                    obj.hide_render = True
+            print('INFO: Using cached merged mesh(es) for baking...')
+            return merged_obj
 
     # Duplicate objects
     new_objs = get_duplicated_mesh_objects(scene, objs, hide_original)
@@ -1676,10 +2435,156 @@ def get_merged_mesh_objects(scene, objs, hide_original=False):
         if nm != merged_obj.data:
             bpy.data.meshes.remove(nm)
 
+    if use_cache:
+        set_cached_merged_mesh_object(objs, merged_obj, fingerprint)
+
     print('INFO: Merging mesh(es) is done at', '{:0.2f}'.format(time.time() - tt), 'seconds!')
     return merged_obj
 
-def resize_image(image, width, height, colorspace='Non-Color', samples=1, margin=0, segment=None, alpha_aware=True, yp=None, bake_device='GPU', specific_tile=0):
+def resample_kernel_box(x):
+    return ((x >= -0.5) & (x < 0.5)).astype(numpy.float32)
+
+def resample_kernel_bicubic(x, a=-0.5):
+    x = numpy.abs(x)
+    x2 = x * x
+    x3 = x2 * x
+    return numpy.where(x < 1.0, (a + 2.0) * x3 - (a + 3.0) * x2 + 1.0,
+            numpy.where(x < 2.0, a * x3 - 5.0 * a * x2 + 8.0 * a * x - 4.0 * a, 0.0)).astype(numpy.float32)
+
+def resample_kernel_lanczos(x, lobes=3):
+    return numpy.where(numpy.abs(x) < lobes, numpy.sinc(x) * numpy.sinc(x / lobes), 0.0).astype(numpy.float32)
+
+# Filter function and support radius
+resample_filters = {
+        'BOX' : (resample_kernel_box, 0.5),
+        'BICUBIC' : (resample_kernel_bicubic, 2.0),
+        'LANCZOS' : (resample_kernel_lanczos, 3.0),
+        }
+
+def get_resample_weights(in_size, out_size, resample_filter):
+    kernel, support = resample_filters[resample_filter]
+
+    # Stretch the filter when downsampling so every source pixel contributes
+    scale = in_size / out_size
+    filter_scale = max(scale, 1.0)
+    support *= filter_scale
+
+    centers = (numpy.arange(out_size) + 0.5) * scale
+    lefts = numpy.floor(centers - support).astype(numpy.int32)
+    num_taps = int(math.ceil(support * 2.0)) + 1
+
+    indices = lefts[:, None] + numpy.arange(num_taps)[None, :]
+    weights = kernel((indices + 0.5 - centers[:, None]) / filter_scale)
+
+    # Normalize weights
+    total = weights.sum(axis=1, keepdims=True)
+    weights /= numpy.where(total == 0.0, 1.0, total)
+
+    return numpy.clip(indices, 0, in_size - 1), weights
+
+def resample_axis(arr, out_size, axis, resample_filter):
+    in_size = arr.shape[axis]
+    if in_size == out_size: return arr
+
+    if resample_filter == 'AUTO':
+        resample_filter = 'BOX' if out_size < in_size else 'LANCZOS'
+
+    indices, weights = get_resample_weights(in_size, out_size, resample_filter)
+
+    shape = [1] * arr.ndim
+    shape[axis] = out_size
+
+    result = None
+    for i in range(indices.shape[1]):
+        tap = numpy.take(arr, indices[:, i], axis=axis) * weights[:, i].reshape(shape)
+        if result is None: result = tap
+        else: result += tap
+
+    return result
+
+def resample_pixels(pxs, width, height, alpha_aware=True, resample_filter='AUTO', clamp=True):
+    # Resample pixels with shape (height, width, 4) to new size
+    pxs = pxs.astype(numpy.float32)
+
+    # Premultiply so transparent pixels won't bleed their color
+    if alpha_aware:
+        pxs[..., :3] *= pxs[..., 3:4]
+
+    result = resample_axis(pxs, width, 1, resample_filter)
+    result = resample_axis(result, height, 0, resample_filter)
+
+    if alpha_aware:
+        alpha = result[..., 3:4]
+        rgb = result[..., :3]
+        numpy.divide(rgb, alpha, out=rgb, where=alpha > 0.0)
+
+    # Lanczos and bicubic can overshoot
+    if clamp:
+        numpy.clip(result, 0.0, 1.0, out=result)
+
+    return result
+
+def resize_image_numpy(image, width, height, colorspace='Non-Color', segment=None, alpha_aware=True, yp=None, tilenums=[1001], resample_filter='AUTO'):
+
+    T = time.time()
+    image_name = image.name
+    print('RESIZE IMAGE: Doing numpy resize image pass on', image_name + '...')
+
+    new_segment = None
+
+    # Resize all tiles in parallel, tile sizes will follow the resized tile files
+    if image.source == 'TILED' and not segment:
+        # Tiles can be processed on worker threads, so image data should be read before
+        clamp = not image.is_float
+
+        def resize_tile(tilenum, pxs_list):
+            return [resample_pixels(pxs_list[0], width, height, alpha_aware, resample_filter, clamp=clamp)]
+
+        UDIM.process_tiles([image], tilenums, resize_tile)
+        tilenums = []
+
+    for tilenum in tilenums:
+
+        pxs = get_image_pixels_mirror(image)
+
+        if segment:
+            ori_start_x = segment.width * segment.tile_x
+            ori_start_y = segment.height * segment.tile_y
+            pxs = pxs[ori_start_y:ori_start_y+segment.height, ori_start_x:ori_start_x+segment.width]
+
+        scaled_pxs = resample_pixels(pxs, width, height, alpha_aware, resample_filter, clamp=not image.is_float)
+
+        if segment:
+            new_segment = ImageAtlas.get_set_image_atlas_segment(
+                        width, height, image.yia.color, image.is_float, yp=yp)
+            scaled_img = new_segment.id_data
+
+            # Write resized pixels directly to the new segment
+            start_x = width * new_segment.tile_x
+            start_y = height * new_segment.tile_y
+            dest_pxs = get_image_pixels_mirror(scaled_img)
+            dest_pxs[start_y:start_y+height, start_x:start_x+width] = scaled_pxs
+            set_image_pixels_mirror(scaled_img, dest_pxs)
+
+            image = scaled_img
+
+        else:
+            scaled_img = bpy.data.images.new(name='__TEMP__', 
+                width=width, height=height, alpha=True, float_buffer=image.is_float)
+            scaled_img.colorspace_settings.name = colorspace
+            if image.filepath != '' and not image.packed_file:
+                scaled_img.filepath = image.filepath
+            scaled_img.pixels.foreach_set(scaled_pxs.ravel())
+
+            # Replace original image to scaled image
+            replace_image(image, scaled_img)
+            image = scaled_img
+
+    print('RESIZE IMAGE:', image_name, 'Resize image is done at', '{:0.2f}'.format(time.time() - T), 'seconds!')
+
+    return image, new_segment
+
+def resize_image(image, width, height, colorspace='Non-Color', samples=1, margin=0, segment=None, alpha_aware=True, yp=None, bake_device='GPU', specific_tile=0, use_numpy=True, resample_filter='AUTO'):
 
     T = time.time()
     image_name = image.name
@@ -1694,9 +2599,7 @@ def resize_image(image, width, height, colorspace='Non-Color', samples=1, margin
             ori_height = image.size[1]
 
         if ori_width == width and ori_height == height:
-            return
-
-    book = remember_before_bake()
+            return image, None
 
     if image.source == 'TILED':
         if specific_tile < 1001:
@@ -1704,6 +2607,12 @@ def resize_image(image, width, height, colorspace='Non-Color', samples=1, margin
         else: tilenums = [specific_tile]
     else: tilenums = [1001]
 
+    # Resample pixels directly if possible since it's much faster than baking
+    if use_numpy and is_greater_than_283():
+        return resize_image_numpy(image, width, height, colorspace, segment, alpha_aware, yp, tilenums, resample_filter)
+
+    book = remember_before_bake()
+
     # Set active collection to be root collection
     if is_greater_than_280():
         ori_layer_collection = bpy.context.view_layer.active_layer_collection
@@ -1746,11 +2655,8 @@ def resize_image(image, width, height, colorspace='Non-Color', samples=1, margin
 
     new_segment = None
 
-    for tilenum in tilenums:
-
-        # Swap tile to 1001 to access the data
-        if tilenum != 1001:
-            UDIM.swap_tile(image, 1001, tilenum)
+    # Tile data will be accessible from tile 1001
+    for tilenum in UDIM.iterate_tiles([image], tilenums):
 
         if segment:
             new_segment = ImageAtlas.get_set_image_atlas_segment(
@@ -1869,10 +2775,6 @@ def resize_image(image, width, height, colorspace='Non-Color', samples=1, margin
                 replace_image(image, scaled_img)
             image = scaled_img
 
-        # Swap back the tile
-        if tilenum != 1001:
-            UDIM.swap_tile(image, 1001, tilenum)
-
     # Remove temp datas
     if straight_over.node_tree.users == 1:
         bpy.data.node_groups.remove(straight_over.node_tree)
@@ -1,4 +1,4 @@
-import bpy, os, sys, re, time, numpy, math
+import bpy, os, sys, re, time, numpy, math, contextlib, functools
 from mathutils import *
 from bpy.app.handlers import persistent
 #from .__init__ import bl_info
@@ -1747,6 +1747,147 @@ def replace_new_node(tree, entity, prop, node_id_name, label='', group_name='',
 
     return node
 
+# Batched tree updates, key is pointer of the yp tree so renaming the tree won't lose the batch
+# Reconnect and rearrange calls on batched tree are recorded and run once when the batch is committed
+_tree_update_batches = {}
+
+def get_tree_by_pointer(pointer):
+    for tree in bpy.data.node_groups:
+        if tree.as_pointer() == pointer:
+            return tree
+
+    return None
+
+def begin_tree_update_batch(tree):
+    batch = _tree_update_batches.get(tree.as_pointer())
+    if batch:
+        batch['depth'] += 1
+    else: _tree_update_batches[tree.as_pointer()] = {'depth' : 1, 'updates' : {}, 'committing' : False}
+
+def get_layer_update_key(layer):
+    # Layer is identified by its node tree, since layer name can change and layer collection can be reallocated
+    layer_tree = get_tree(layer)
+    return layer_tree.as_pointer() if layer_tree else None
+
+def defer_tree_update(tree, kind, entity=None, args=()):
+    # Returns True if the update is recorded to be run later
+    batch = _tree_update_batches.get(tree.as_pointer())
+    if not batch or batch['committing']: return False
+
+    key = None
+    if entity:
+        key = get_layer_update_key(entity)
+        if key == None: return False
+
+    # Reconnects and rearranges are full rebuilds, so the same update only need to be run once with the last arguments
+    batch['updates'].pop((kind, key), None)
+    batch['updates'][(kind, key)] = args
+
+    return True
+
+def run_tree_update_batch(tree, batch):
+    from .node_connections import reconnect_yp_nodes, reconnect_layer_nodes
+    from .node_arrangements import rearrange_yp_nodes, rearrange_layer_nodes
+
+    T = time.time()
+    yp = tree.yp
+    updates = batch['updates']
+    batch['updates'] = {}
+
+    # Find layers by their node tree
+    layers = {}
+    for layer in yp.layers:
+        key = get_layer_update_key(layer)
+        if key != None: layers[key] = layer
+
+    batch['committing'] = True
+    try:
+        for kind in ['RECONNECT_LAYER', 'REARRANGE_LAYER']:
+            for (k, key), args in updates.items():
+                if k != kind: continue
+
+                layer = layers.get(key)
+                if not layer: continue
+
+                if kind == 'RECONNECT_LAYER':
+                    reconnect_layer_nodes(layer, *args)
+                else: rearrange_layer_nodes(layer)
+
+        if ('RECONNECT_YP', None) in updates:
+            reconnect_yp_nodes(tree, *updates[('RECONNECT_YP', None)])
+        if ('REARRANGE_YP', None) in updates:
+            rearrange_yp_nodes(tree)
+
+    finally:
+        batch['committing'] = False
+
+    if updates:
+        print('INFO:', len(updates), 'batched update(s) of', tree.name, 'are done at', '{:0.2f}'.format((time.time() - T) * 1000), 'ms!')
+
+def flush_tree_update_batch(tree):
+    # Run pending updates now without closing the batch, it's needed before baking so the baked tree is up to date
+    batch = _tree_update_batches.get(tree.as_pointer())
+    if not batch or batch['committing'] or not batch['updates']: return
+    run_tree_update_batch(tree, batch)
+
+def commit_tree_update_batch(tree, force=False):
+    batch = _tree_update_batches.get(tree.as_pointer())
+    if not batch: return
+
+    batch['depth'] -= 1
+    if batch['depth'] > 0 and not force: return
+
+    try: run_tree_update_batch(tree, batch)
+    finally: _tree_update_batches.pop(tree.as_pointer(), None)
+
+@contextlib.contextmanager
+def yp_tree_update_batch(tree):
+    ''' Run tree reconnects and rearranges once at the end of the block '''
+    begin_tree_update_batch(tree)
+    try: yield
+    finally: commit_tree_update_batch(tree)
+
+def batch_active_tree_updates(func):
+    ''' Decorator for operator execute/invoke to batch updates of the active yp tree '''
+    @functools.wraps(func)
+    def wrapper(self, context, *args):
+        node = get_active_ypaint_node()
+        if not node or not node.node_tree or not hasattr(node.node_tree, 'yp'):
+            return func(self, context, *args)
+
+        with yp_tree_update_batch(node.node_tree):
+            return func(self, context, *args)
+
+    return wrapper
+
+def batch_entity_tree_updates(func):
+    ''' Decorator for property update callbacks to batch updates of the yp tree owning the entity '''
+    @functools.wraps(func)
+    def wrapper(self, context):
+        tree = self.id_data
+        if not isinstance(tree, bpy.types.NodeTree) or not hasattr(tree, 'yp') or not tree.yp.is_ypaint_node:
+            return func(self, context)
+
+        with yp_tree_update_batch(tree):
+            return func(self, context)
+
+    return wrapper
+
+def defer_tree_updates_to_idle(tree, interval=0.0):
+    # Batch all updates of the tree until the next idle timer tick
+    if tree.as_pointer() in _tree_update_batches: return
+    begin_tree_update_batch(tree)
+
+    pointer = tree.as_pointer()
+    def commit_on_idle():
+        if pointer in _tree_update_batches:
+            t = get_tree_by_pointer(pointer)
+            if t: commit_tree_update_batch(t, force=True)
+            else: _tree_update_batches.pop(pointer, None)
+        return None
+
+    bpy.app.timers.register(commit_on_idle, first_interval=interval)
+
 def get_tree(entity):
 
     #m = re.match(r'yp\.layers\[(\d+)\]', entity.path_from_id())
@@ -2270,28 +2411,12 @@ def get_output_index(root_ch):
 def get_layer_depth(layer):
 
     yp = layer.id_data.yp
+    hierarchy = get_layer_hierarchy(yp)
+    layer_idx = get_layer_index(layer)
 
-    upmost_found = False
-    depth = 0
-    cur = layer
-    parent = layer
-
-    while True:
-        if cur.parent_idx != -1:
-
-            try: layer = yp.layers[cur.parent_idx]
-            except: break
-
-            if layer.type == 'GROUP':
-                parent = layer
-                depth += 1
-
-        if parent == cur:
-            break
-
-        cur = parent
+    if layer_idx == None: return 0
 
-    return depth
+    return len(hierarchy['ancestors'][layer_idx])
 
 def is_top_member(layer, enabled_only=False):
     
@@ -2355,18 +2480,123 @@ def is_bottom_member(layer, enabled_only=False):
 #
 #    return parent_idx
 
+# Layer name to index map for each yp tree, key is pointer of the yp tree so renaming the tree won't orphan the map
+# It's only rebuilt when a lookup finds stale index, so moving layers around only cost one rebuild
+_layer_index_cache = {}
+
+# Layer hierarchy for each yp tree, key is pointer of the yp tree and value is (number of layers, hierarchy)
+# It's invalidated explicitly when layers are moved, removed, reparented, or change type, so it will be rebuilt once after that
+_layer_hierarchy_cache = {}
+
+def invalidate_layer_hierarchy(yp):
+    _layer_hierarchy_cache.pop(yp.id_data.as_pointer(), None)
+
+def clear_layer_caches():
+    # Undo and file load can reuse tree pointers with different layers
+    _layer_hierarchy_cache.clear()
+    _layer_index_cache.clear()
+
+def get_layer_index_map(yp, rebuild=False):
+    key = yp.id_data.as_pointer()
+
+    index_map = _layer_index_cache.get(key)
+    if index_map == None or rebuild:
+        index_map = {}
+        for i, t in enumerate(yp.layers):
+            if t.name not in index_map:
+                index_map[t.name] = i
+        _layer_index_cache[key] = index_map
+
+    return index_map
+
+def get_layer_parent_ids(yp):
+    parent_ids = numpy.empty(len(yp.layers), dtype=numpy.int32)
+    if len(parent_ids) > 0:
+        yp.layers.foreach_get('parent_idx', parent_ids)
+
+    return parent_ids
+
+def build_layer_hierarchy(parent_ids, layer_types):
+
+    num_layers = len(parent_ids)
+    parent_ids = parent_ids.tolist()
+    is_group = [t == 'GROUP' for t in layer_types]
+
+    # Only group layers can be a parent
+    parents = [p if p >= 0 and p < num_layers and is_group[p] else -1 for p in parent_ids]
+
+    # List of parent ids from the nearest to the upmost parent
+    ancestors = [None] * num_layers
+    for i in range(num_layers):
+        if ancestors[i] != None: continue
+
+        chain = []
+        cur = i
+        while cur != -1 and ancestors[cur] == None and cur not in chain:
+            chain.append(cur)
+            cur = parents[cur]
+
+        up = ancestors[cur] if cur != -1 and ancestors[cur] != None else []
+        for c in reversed(chain):
+            up = [parents[c]] + up if parents[c] != -1 else []
+            ancestors[c] = up
+
+    children = [[] for i in range(num_layers)]
+    descendants = [[] for i in range(num_layers)]
+    for i in range(num_layers):
+        p = parent_ids[i]
+        if p >= 0 and p < num_layers:
+            children[p].append(i)
+        for a in ancestors[i]:
+            descendants[a].append(i)
+
+    # Group members are placed right after the group, so the subtree of a layer is a range of indices
+    subtree_end = [max([d for d in descendants[i] if d > i], default=i) for i in range(num_layers)]
+
+    return {
+            'ancestors' : ancestors,
+            'children' : children,
+            'descendants' : descendants,
+            'subtree_end' : subtree_end,
+            }
+
+def get_layer_hierarchy(yp):
+    key = yp.id_data.as_pointer()
+    num_layers = len(yp.layers)
+
+    # Number of layers is also checked in case layers are added without invalidation
+    cache = _layer_hierarchy_cache.get(key)
+    if cache and cache[0] == num_layers:
+        return cache[1]
+
+    parent_ids = get_layer_parent_ids(yp)
+    layer_types = [t.type for t in yp.layers]
+    hierarchy = build_layer_hierarchy(parent_ids, layer_types)
+    _layer_hierarchy_cache[key] = (num_layers, hierarchy)
+
+    return hierarchy
+
 def get_layer_index(layer):
     yp = layer.id_data.yp
 
+    # Check the cached index first and rebuild the map once if it's stale
+    for rebuild in (False, True):
+        idx = get_layer_index_map(yp, rebuild).get(layer.name)
+        if idx != None and idx < len(yp.layers) and yp.layers[idx] == layer:
+            return idx
+
     for i, t in enumerate(yp.layers):
         if layer == t:
             return i
 
 def get_layer_index_by_name(yp, name):
 
-    for i, t in enumerate(yp.layers):
-        if name == t.name:
-            return i
+    if not name: return -1
+
+    for rebuild in (False, True):
+        idx = get_layer_index_map(yp, rebuild).get(name)
+        if idx != None and idx < len(yp.layers) and yp.layers[idx].name == name:
+            return idx
 
     return -1
 
@@ -2399,30 +2629,16 @@ def get_parent(layer):
 def is_parent_hidden(layer):
 
     yp = layer.id_data.yp
+    hierarchy = get_layer_hierarchy(yp)
+    layer_idx = get_layer_index(layer)
 
-    hidden = False
-    
-    cur = layer
-    parent = layer
-
-    while True:
-        if cur.parent_idx != -1:
-
-            try: layer = yp.layers[cur.parent_idx]
-            except: break
-
-            if layer.type == 'GROUP':
-                parent = layer
-                if not parent.enable:
-                    hidden = True
-                    break
+    if layer_idx == None: return False
 
-        if parent == cur:
-            break
-
-        cur = parent
+    for i in hierarchy['ancestors'][layer_idx]:
+        if not yp.layers[i].enable:
+            return True
 
-    return hidden
+    return False
 
 def set_parent_dict_val(yp, parent_dict, name, target_idx):
 
@@ -2438,29 +2654,15 @@ def get_list_of_direct_child_ids(layer):
     if layer.type != 'GROUP':
         return []
 
+    hierarchy = get_layer_hierarchy(yp)
     layer_idx = get_layer_index(layer)
 
-    childs = []
-    for i, t in enumerate(yp.layers):
-        if t.parent_idx == layer_idx:
-            childs.append(i)
-
-    return childs
+    return list(hierarchy['children'][layer_idx])
 
 def get_list_of_direct_childrens(layer):
     yp = layer.id_data.yp
 
-    if layer.type != 'GROUP':
-        return []
-
-    layer_idx = get_layer_index(layer)
-
-    childs = []
-    for t in yp.layers:
-        if t.parent_idx == layer_idx:
-            childs.append(t)
-
-    return childs
+    return [yp.layers[i] for i in get_list_of_direct_child_ids(layer)]
 
 def get_list_of_all_childs_and_child_ids(layer):
     yp = layer.id_data.yp
@@ -2468,65 +2670,35 @@ def get_list_of_all_childs_and_child_ids(layer):
     if layer.type != 'GROUP':
         return [], []
 
+    hierarchy = get_layer_hierarchy(yp)
     layer_idx = get_layer_index(layer)
 
-    childs = []
-    child_ids = []
-    for i, t in enumerate(yp.layers):
-        if t.parent_idx == layer_idx or t.parent_idx in child_ids:
-            childs.append(t)
-            child_ids.append(i)
+    child_ids = list(hierarchy['descendants'][layer_idx])
+    childs = [yp.layers[i] for i in child_ids]
 
     return childs, child_ids
 
 def get_list_of_parent_ids(layer):
 
     yp = layer.id_data.yp
+    hierarchy = get_layer_hierarchy(yp)
+    layer_idx = get_layer_index(layer)
 
-    cur = layer
-    parent = layer
-    parent_list = []
-
-    while True:
-        if cur.parent_idx != -1:
-
-            try: layer = yp.layers[cur.parent_idx]
-            except: break
-
-            if layer.type == 'GROUP':
-                parent = layer
-                parent_list.append(cur.parent_idx)
-
-        if parent == cur:
-            break
-
-        cur = parent
+    if layer_idx == None: return []
 
-    return parent_list
+    return list(hierarchy['ancestors'][layer_idx])
 
 def get_last_chained_up_layer_ids(layer, idx_limit):
 
     yp = layer.id_data.yp
+    hierarchy = get_layer_hierarchy(yp)
     layer_idx = get_layer_index(layer)
 
-    cur = layer
-    parent = layer
     parent_idx = layer_idx
 
-    while True:
-        if cur.parent_idx != -1 and cur.parent_idx != idx_limit:
-
-            try: layer = yp.layers[cur.parent_idx]
-            except: break
-
-            if layer.type == 'GROUP':
-                parent = layer
-                parent_idx = cur.parent_idx
-
-        if parent == cur:
-            break
-
-        cur = parent
+    for i in hierarchy['ancestors'][layer_idx]:
+        if i == idx_limit: break
+        parent_idx = i
 
     return parent_idx
 
@@ -2589,11 +2761,9 @@ def get_last_child_idx(layer): #, very_last=False):
     if layer.type != 'GROUP': 
         return layer_idx
 
-    for i, t in reversed(list(enumerate(yp.layers))):
-        if i > layer_idx and layer_idx in get_list_of_parent_ids(t):
-            return i
+    hierarchy = get_layer_hierarchy(yp)
 
-    return layer_idx
+    return hierarchy['subtree_end'][layer_idx]
 
 def get_upper_neighbor(layer):
 
@@ -2934,6 +3104,65 @@ def remove_temp_uv(obj, entity):
             mirror.offset_u = obj.yp.ori_offset_u
             mirror.offset_v = obj.yp.ori_offset_v
 
+# Key of the current temp uv per object, value is (mesh pointer, number of loops, source uv name, mapping matrix)
+# Temp uv with the same key can be kept as is, so switching back to the same layer won't need to recreate it
+# Source uv can only be edited on edit mode, so the cache is cleared when the object is out of edit mode
+_temp_uv_cache = {}
+
+def clear_temp_uv_cache(obj=None):
+    if obj: _temp_uv_cache.pop(obj.name, None)
+    else: _temp_uv_cache.clear()
+
+def get_temp_uv_matrix(mapping):
+    # Create transformation matrix
+    # Scale
+    if not is_greater_than_281():
+        m = Matrix((
+            (mapping.scale[0], 0, 0),
+            (0, mapping.scale[1], 0),
+            (0, 0, mapping.scale[2])
+            ))
+
+        # Rotate
+        m.rotate(Euler((mapping.rotation[0], mapping.rotation[1], mapping.rotation[2])))
+
+        # Translate
+        m = m.to_4x4()
+        m[0][3] = mapping.translation[0]
+        m[1][3] = mapping.translation[1]
+        m[2][3] = mapping.translation[2]
+    else:
+        m = Matrix((
+            (mapping.inputs[3].default_value[0], 0, 0),
+            (0, mapping.inputs[3].default_value[1], 0),
+            (0, 0, mapping.inputs[3].default_value[2])
+            ))
+
+        # Rotate
+        m.rotate(Euler((mapping.inputs[2].default_value[0], mapping.inputs[2].default_value[1], mapping.inputs[2].default_value[2])))
+
+        # Translate
+        m = m.to_4x4()
+        m[0][3] = mapping.inputs[1].default_value[0]
+        m[1][3] = mapping.inputs[1].default_value[1]
+        m[2][3] = mapping.inputs[1].default_value[2]
+
+    return m
+
+def get_temp_uv_source_and_mapping(entity, layer, layer_tree, m1, m2, m3):
+    if m1: 
+        return get_layer_source(entity), get_layer_mapping(entity)
+    elif m2: 
+        return get_mask_source(entity), get_mask_mapping(entity)
+    elif m3: 
+        return layer_tree.nodes.get(entity.source), get_layer_mapping(layer)
+    return None, None
+
+def get_temp_uv_key(obj, layer_uv, mapping):
+    m = get_temp_uv_matrix(mapping)
+    return (obj.data.as_pointer(), len(obj.data.loops), layer_uv.name, 
+            (m[0][0], m[0][1], m[1][0], m[1][1], m[0][3], m[1][3]))
+
 def refresh_temp_uv(obj, entity): 
 
     if obj.type != 'MESH':
@@ -2970,6 +3199,23 @@ def refresh_temp_uv(obj, entity):
         if not layer_uv: 
             return False
 
+    # Keep current temp uv if it's already made from the same uv and mapping
+    # Last mode is checked in case this is called right after edit mode before the cache is cleared
+    if (layer_uv and obj.mode == 'TEXTURE_PAINT' and obj.name in _temp_uv_cache and 
+            bpy.context.scene.yp.last_mode != 'EDIT'):
+        is_image = entity.override_type == 'IMAGE' if m3 else entity.type == 'IMAGE'
+        temp_uv_layer = uv_layers.get(TEMP_UV)
+        if is_image and temp_uv_layer:
+            source, mapping = get_temp_uv_source_and_mapping(entity, layer, layer_tree, m1, m2, m3)
+            if (hasattr(source, 'image') and source.image and is_transformed(mapping) and 
+                    _temp_uv_cache[obj.name] == get_temp_uv_key(obj, layer_uv, mapping)):
+                if uv_layers.active != temp_uv_layer:
+                    uv_layers.active = temp_uv_layer
+                    temp_uv_layer.active_render = True
+                return True
+
+    _temp_uv_cache.pop(obj.name, None)
+
     # Set active uv
     if uv_layers.active != layer_uv:
         uv_layers.active = layer_uv
@@ -2993,20 +3239,7 @@ def refresh_temp_uv(obj, entity):
     #yp.need_temp_uv_refresh = False
 
     # Get source
-    if m1: 
-        source = get_layer_source(entity)
-        mapping = get_layer_mapping(entity)
-        #print('Layer!')
-    elif m2: 
-        source = get_mask_source(entity)
-        mapping = get_mask_mapping(entity)
-        #print('Mask!')
-    elif m3: 
-        source = layer_tree.nodes.get(entity.source)
-        mapping = get_layer_mapping(layer)
-        #print('Channel!')
-    else: return False
-
+    source, mapping = get_temp_uv_source_and_mapping(entity, layer, layer_tree, m1, m2, m3)
     if not hasattr(source, 'image'): return False
 
     img = source.image
@@ -3029,38 +3262,7 @@ def refresh_temp_uv(obj, entity):
     if not is_greater_than_280():
         temp_uv_layer = obj.data.uv_layers.get(TEMP_UV)
 
-    # Create transformation matrix
-    # Scale
-    if not is_greater_than_281():
-        m = Matrix((
-            (mapping.scale[0], 0, 0),
-            (0, mapping.scale[1], 0),
-            (0, 0, mapping.scale[2])
-            ))
-
-        # Rotate
-        m.rotate(Euler((mapping.rotation[0], mapping.rotation[1], mapping.rotation[2])))
-
-        # Translate
-        m = m.to_4x4()
-        m[0][3] = mapping.translation[0]
-        m[1][3] = mapping.translation[1]
-        m[2][3] = mapping.translation[2]
-    else:
-        m = Matrix((
-            (mapping.inputs[3].default_value[0], 0, 0),
-            (0, mapping.inputs[3].default_value[1], 0),
-            (0, 0, mapping.inputs[3].default_value[2])
-            ))
-
-        # Rotate
-        m.rotate(Euler((mapping.inputs[2].default_value[0], mapping.inputs[2].default_value[1], mapping.inputs[2].default_value[2])))
-
-        # Translate
-        m = m.to_4x4()
-        m[0][3] = mapping.inputs[1].default_value[0]
-        m[1][3] = mapping.inputs[1].default_value[1]
-        m[2][3] = mapping.inputs[1].default_value[2]
+    m = get_temp_uv_matrix(mapping)
 
     # Create numpy array to store uv coordinates
     arr = numpy.zeros(len(obj.data.loops)*2, dtype=numpy.float32)
@@ -3068,19 +3270,10 @@ def refresh_temp_uv(obj, entity):
     temp_uv_layer.data.foreach_get('uv', arr)
     arr.shape = (arr.shape[0]//2, 2)
 
-    # Matrix transformation for each uv coordinates
-    if is_greater_than_280():
-        for uv in arr:
-            vec = Vector((uv[0], uv[1], 0.0)) #, 1.0))
-            vec = m @ vec
-            uv[0] = vec[0]
-            uv[1] = vec[1]
-    else:
-        for uv in arr:
-            vec = Vector((uv[0], uv[1], 0.0)) #, 1.0))
-            vec = m * vec
-            uv[0] = vec[0]
-            uv[1] = vec[1]
+    # Affine transformation of uv coordinates, z is zero so only the 2D part is needed
+    mat = numpy.array([[m[0][0], m[0][1]], [m[1][0], m[1][1]]], dtype=numpy.float32)
+    offset = numpy.array([m[0][3], m[1][3]], dtype=numpy.float32)
+    arr = arr @ mat.T + offset
 
     # Set back uv coordinates
     #obj.data.uv_layers.active.data.foreach_set('uv', arr.ravel())
@@ -3094,6 +3287,9 @@ def refresh_temp_uv(obj, entity):
     if ori_mode == 'EDIT':
         bpy.ops.object.mode_set(mode='EDIT')
 
+    # Uv can still be edited on edit mode, so only remember temp uv made outside of it
+    else: _temp_uv_cache[obj.name] = get_temp_uv_key(obj, layer_uv, mapping)
+
     return True
 
 def set_bump_backface_flip(node, flip_backface):
@@ -4498,6 +4694,43 @@ def get_write_height(ch):
     # BUMP_NORMAL_MAP currently always write height
     #return True 
 
+def get_flow_vectors(vert_indices, loop_starts, loop_totals, uvs0, uvs1):
+    num_loops = len(vert_indices)
+
+    # Index of the next loop in the same polygon, so every polygon edge is a pair of loops
+    next_loops = numpy.arange(1, num_loops + 1)
+    next_loops[loop_starts + loop_totals - 1] = loop_starts
+
+    # Order loop pair by its vertex index, like polygon edge keys
+    loops0 = numpy.arange(num_loops)
+    loops1 = next_loops
+    swap = vert_indices[loops0] > vert_indices[loops1]
+    li0 = numpy.where(swap, loops1, loops0)
+    li1 = numpy.where(swap, loops0, loops1)
+
+    # Dot product of normalized straight uv edge with main orientation (0, -1)
+    vecs1 = uvs1[li0] - uvs1[li1]
+    lengths = numpy.linalg.norm(vecs1, axis=1)
+    dots = -numpy.divide(vecs1[:, 1], lengths, out=numpy.zeros_like(lengths), where=lengths > 0.0)
+
+    vecs0 = (uvs0[li0] - uvs0[li1]) * dots[:, None]
+
+    # Unique corners are based on vertex index and uv0 location
+    keys = numpy.column_stack((vert_indices.astype(numpy.float64), uvs0.astype(numpy.float64)))
+    corner_ids = numpy.unique(keys, axis=0, return_inverse=True)[1].ravel()
+    num_corners = corner_ids.max() + 1 if num_loops > 0 else 0
+
+    # Add uv edge vector to each unique corner
+    corner_vecs = numpy.zeros((num_corners, 2), dtype=numpy.float64)
+    numpy.add.at(corner_vecs, corner_ids[li0], vecs0)
+    numpy.add.at(corner_vecs, corner_ids[li1], vecs0)
+
+    # Normalize the vector
+    lengths = numpy.linalg.norm(corner_vecs, axis=1)
+    numpy.divide(corner_vecs, lengths[:, None], out=corner_vecs, where=lengths[:, None] > 0.0)
+
+    return corner_vecs[corner_ids] / 2.0 + 0.5
+
 def get_flow_vcol(obj, uv0, uv1):
 
     vcols = get_vertex_colors(obj)
@@ -4505,63 +4738,31 @@ def get_flow_vcol(obj, uv0, uv1):
     if not vcol:
         vcol = new_vertex_color(obj, FLOW_VCOL, data_type='BYTE_COLOR', domain='CORNER')
 
-    # Orientation of straight uv
-    main_vec = Vector((0, -1))
+    mesh = obj.data
+    num_loops = len(mesh.loops)
+    num_polys = len(mesh.polygons)
 
-    # To store each variation of corners for each vertices
-    corner_vecs = []
-    corner_locs = []
-    
-    for i in range(len(obj.data.vertices)):
-        corner_locs.append([])
-        corner_vecs.append([])
-        
-    # Store unique corners based on uv0 locations
-    for i in range(len(obj.data.vertices)):
-        
-        locs0 = [uv0.data[li].uv for li, l in enumerate(obj.data.loops) if l.vertex_index == i]
-        
-        for loc in locs0:
-            if loc not in corner_locs[i]:
-                corner_locs[i].append(loc)
-                corner_vecs[i].append(Vector((0, 0)))
-    
-    # Add uv edge vector to each unique corner
-    for poly in obj.data.polygons:
-        for ek in poly.edge_keys:
-            # Get loop index
-            li0 = [li for li in poly.loop_indices if obj.data.loops[li].vertex_index == ek[0]][0]
-            li1 = [li for li in poly.loop_indices if obj.data.loops[li].vertex_index == ek[1]][0]
-            vec1 = uv1.data[li0].uv - uv1.data[li1].uv
-            vec1.normalize()
-            dot = main_vec.dot(vec1)
-            
-            vec0 = uv0.data[li0].uv - uv0.data[li1].uv
-            
-            # Add vector to stored corner data
-            for i, cl in enumerate(corner_locs[ek[0]]):
-                if cl == uv0.data[li0].uv:
-                    corner_vecs[ek[0]][i] += vec0 * dot
-            for i, cl in enumerate(corner_locs[ek[1]]):
-                if cl == uv0.data[li1].uv:
-                    corner_vecs[ek[1]][i] += vec0 * dot
-        
-    # Normalize the vector and store it to vertex color
-    for i, cl in enumerate(corner_locs):
-        
-        for j, cll in enumerate(cl):
-            cv = corner_vecs[i][j]
-            cv.normalize()
-            cv /= 2.0
-            cv += Vector((0.5, 0.5))
-        
-            lis = [li for li, l in enumerate(obj.data.loops) if uv0.data[li].uv == cll]
-            
-            for li in lis:
-                if is_greater_than_280():
-                    vcol.data[li].color = (cv.x, cv.y, 0.0, 1.0)
-                else:
-                    vcol.data[li].color = (cv.x, cv.y, 0.0)
+    vert_indices = numpy.empty(num_loops, dtype=numpy.int32)
+    mesh.loops.foreach_get('vertex_index', vert_indices)
+
+    loop_starts = numpy.empty(num_polys, dtype=numpy.int32)
+    loop_totals = numpy.empty(num_polys, dtype=numpy.int32)
+    mesh.polygons.foreach_get('loop_start', loop_starts)
+    mesh.polygons.foreach_get('loop_total', loop_totals)
+
+    uvs0 = numpy.empty(num_loops * 2, dtype=numpy.float32)
+    uvs1 = numpy.empty(num_loops * 2, dtype=numpy.float32)
+    uv0.data.foreach_get('uv', uvs0)
+    uv1.data.foreach_get('uv', uvs1)
+
+    vecs = get_flow_vectors(vert_indices, loop_starts, loop_totals, uvs0.reshape(-1, 2), uvs1.reshape(-1, 2))
+
+    # Store it to vertex color
+    num_channels = 4 if is_greater_than_280() else 3
+    colors = numpy.zeros((num_loops, num_channels), dtype=numpy.float32)
+    colors[:, :2] = vecs
+    if num_channels == 4: colors[:, 3] = 1.0
+    vcol.data.foreach_set('color', colors.ravel())
 
     return vcol
 
@@ -4903,7 +5104,75 @@ def get_first_mirror_modifier(obj):
 
     return None
 
-def copy_image_channel_pixels(src, dest, src_idx=0, dest_idx=0, segment=None, segment_src=None):
+# Numpy mirrors of image pixels, keyed by image name
+# Each entry is [pixels with shape (height, width, 4), dirty]
+_image_pixels_mirrors = {}
+
+def get_image_pixels_mirror(image, use_cache=False, read=True):
+    mirror = _image_pixels_mirrors.get(image.name)
+    if mirror:
+        if use_cache and mirror[0].shape[:2] == (image.size[1], image.size[0]):
+            return mirror[0]
+
+        # Write back pending changes so uncached read will get the latest pixels
+        flush_image_pixels_mirrors([image])
+
+    pxs = numpy.empty(shape=image.size[0]*image.size[1]*4, dtype=numpy.float32)
+
+    # Skipping the read is only used when the caller overwrites the whole image,
+    # so cached mirror will still contain the full image after that
+    if read:
+        image.pixels.foreach_get(pxs)
+
+    # Set array to 3d
+    pxs.shape = (-1, image.size[0], 4)
+
+    if use_cache:
+        _image_pixels_mirrors[image.name] = [pxs, False]
+
+    return pxs
+
+def set_image_pixels_mirror(image, pxs, use_cache=False):
+    mirror = _image_pixels_mirrors.get(image.name)
+    if mirror and mirror[0] is pxs:
+        mirror[1] = True
+        if not use_cache:
+            flush_image_pixels_mirrors([image])
+        return
+
+    image.pixels.foreach_set(pxs.ravel())
+
+def flush_image_pixels_mirrors(images=None, discard=True):
+    names = [img.name for img in images] if images != None else list(_image_pixels_mirrors.keys())
+
+    for name in names:
+        mirror = _image_pixels_mirrors.get(name)
+        if not mirror: continue
+
+        image = bpy.data.images.get(name)
+        if mirror[1] and image and mirror[0].shape[:2] == (image.size[1], image.size[0]):
+            image.pixels.foreach_set(mirror[0].ravel())
+        mirror[1] = False
+
+        if discard:
+            _image_pixels_mirrors.pop(name)
+
+def flush_image_pixels_mirrors_on_exit(func):
+    ''' Decorator for operator execute to always write back and release cached image pixels, even when it fails '''
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try: return func(*args, **kwargs)
+        finally: flush_image_pixels_mirrors()
+
+    return wrapper
+
+def discard_image_pixels_mirror(image):
+    _image_pixels_mirrors.pop(image.name, None)
+
+def is_full_image_region(image, start_x, start_y, width, height):
+    return start_x == 0 and start_y == 0 and width == image.size[0] and height == image.size[1]
+
+def copy_image_channel_pixels(src, dest, src_idx=0, dest_idx=0, segment=None, segment_src=None, cache_src=False, cache_dest=False):
 
     start_x = 0
     start_y = 0
@@ -4928,19 +5197,13 @@ def copy_image_channel_pixels(src, dest, src_idx=0, dest_idx=0, segment=None, se
     if is_greater_than_283():
 
         # Store pixels to numpy
-        dest_pxs = numpy.empty(shape=dest.size[0]*dest.size[1]*4, dtype=numpy.float32)
-        src_pxs = numpy.empty(shape=src.size[0]*src.size[1]*4, dtype=numpy.float32)
-        dest.pixels.foreach_get(dest_pxs)
-        src.pixels.foreach_get(src_pxs)
-
-        # Set array to 3d
-        dest_pxs.shape = (-1, dest.size[0], 4)
-        src_pxs.shape = (-1, src.size[0], 4)
+        src_pxs = get_image_pixels_mirror(src, cache_src)
+        dest_pxs = src_pxs if src == dest else get_image_pixels_mirror(dest, cache_dest)
 
         # Copy to selected channel
         #dest_pxs[dest_idx::4] = src_pxs[src_idx::4]
-        dest_pxs[start_y:start_y+height, start_x:start_x+width][::, ::, dest_idx] = src_pxs[src_start_y:src_start_y+height, src_start_x:src_start_x+width][::, ::, src_idx]
-        dest.pixels.foreach_set(dest_pxs.ravel())
+        dest_pxs[start_y:start_y+height, start_x:start_x+width, dest_idx] = src_pxs[src_start_y:src_start_y+height, src_start_x:src_start_x+width, src_idx]
+        set_image_pixels_mirror(dest, dest_pxs, cache_dest)
 
     else:
         # Get image pixels
@@ -4958,7 +5221,7 @@ def copy_image_channel_pixels(src, dest, src_idx=0, dest_idx=0, segment=None, se
 
         dest.pixels = dest_pxs
 
-def copy_image_pixels(src, dest, segment=None, segment_src=None):
+def copy_image_pixels(src, dest, segment=None, segment_src=None, cache_src=False, cache_dest=False):
 
     start_x = 0
     start_y = 0
@@ -4981,18 +5244,15 @@ def copy_image_pixels(src, dest, segment=None, segment_src=None):
         src_start_y = height * segment_src.tile_y
 
     if is_greater_than_283():
-        target_pxs = numpy.empty(shape=dest.size[0]*dest.size[1]*4, dtype=numpy.float32)
-        source_pxs = numpy.empty(shape=src.size[0]*src.size[1]*4, dtype=numpy.float32)
-        dest.pixels.foreach_get(target_pxs)
-        src.pixels.foreach_get(source_pxs)
+        source_pxs = get_image_pixels_mirror(src, cache_src)
 
-        # Set array to 3d
-        target_pxs.shape = (-1, dest.size[0], 4)
-        source_pxs.shape = (-1, src.size[0], 4)
+        # No need to read destination pixels if all of them will be overwritten
+        read_dest = not is_full_image_region(dest, start_x, start_y, width, height)
+        target_pxs = get_image_pixels_mirror(dest, cache_dest, read=read_dest)
 
         target_pxs[start_y:start_y+height, start_x:start_x+width] = source_pxs[src_start_y:src_start_y+height, src_start_x:src_start_x+width]
 
-        dest.pixels.foreach_set(target_pxs.ravel())
+        set_image_pixels_mirror(dest, target_pxs, cache_dest)
 
     else:
         target_pxs = list(dest.pixels)
@@ -5009,7 +5269,7 @@ def copy_image_pixels(src, dest, segment=None, segment_src=None):
 
         dest.pixels = target_pxs
 
-def set_image_pixels(image, color, segment=None):
+def set_image_pixels(image, color, segment=None, use_cache=False):
 
     start_x = 0
     start_y = 0
@@ -5018,21 +5278,18 @@ def set_image_pixels(image, color, segment=None):
     height = image.size[1]
 
     if segment:
-        start_x = width * segment.tile_x
-        start_y = height * segment.tile_y
-
         width = segment.width
         height = segment.height
 
-    if is_greater_than_283():
-        pxs = numpy.empty(shape=image.size[0]*image.size[1]*4, dtype=numpy.float32)
-        image.pixels.foreach_get(pxs)
+        start_x = width * segment.tile_x
+        start_y = height * segment.tile_y
 
-        # Set array to 3d
-        pxs.shape = (-1, image.size[0], 4)
+    if is_greater_than_283():
+        read = not is_full_image_region(image, start_x, start_y, width, height)
+        pxs = get_image_pixels_mirror(image, use_cache, read=read)
 
         pxs[start_y:start_y+height, start_x:start_x+width] = color
-        image.pixels.foreach_set(pxs.ravel())
+        set_image_pixels_mirror(image, pxs, use_cache)
 
     else:
         pxs = list(image.pixels)
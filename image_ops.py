@@ -1,5 +1,5 @@
 import bpy, shutil, os
-import tempfile
+import tempfile, struct, zlib, concurrent.futures
 from bpy.props import *
 from bpy_extras.io_utils import ExportHelper
 #from bpy_extras.image_utils import load_image  
@@ -88,203 +88,303 @@ def pack_float_image(image):
     image.filepath = original_path
     os.remove(temp_filepath)
 
-def clean_object_references(image):
+def get_scene_object_names():
+    names = set()
+    for scene in bpy.data.scenes:
+        if is_greater_than_280():
+            names.update(o.name for o in scene.collection.all_objects)
+        else: names.update(o.name for o in scene.objects)
+    return names
+
+def clean_bake_info_object_references(bake_info, scene_object_names):
+    removed_references = []
+
+    # Check if selected and other objects data are still accessible on any view layers
+    for objs in [bake_info.selected_objects, bake_info.other_objects]:
+        indices = []
+        for i, o in enumerate(objs):
+            if o.object and o.object.name not in scene_object_names:
+                removed_references.append(o.object.name)
+                indices.append(i)
+
+        for i in reversed(indices):
+            objs.remove(i)
+
+    return removed_references
+
+def clean_object_references(image, scene_object_names=None):
+    # Scene objects can be passed to avoid collecting them again when cleaning many images
+    if scene_object_names == None:
+        scene_object_names = get_scene_object_names()
+
     removed_references = []
     if image.yia.is_image_atlas:
         for segment in image.yia.segments:
             if segment.bake_info.is_baked:
+                removed_references.extend(clean_bake_info_object_references(segment.bake_info, scene_object_names))
 
-                # Check if selected objects data are still accessible on any view layers
-                indices = []
-                for i, o in enumerate(segment.bake_info.selected_objects):
-                    if o.object:
-                        if is_greater_than_280():
-                            if not any([s for s in bpy.data.scenes if o.object.name in s.collection.all_objects]):
-                                removed_references.append(o.object.name)
-                                indices.append(i)
-                        else:
-                            if not any([s for s in bpy.data.scenes if o.object.name in s.objects]):
-                                removed_references.append(o.object.name)
-                                indices.append(i)
+    elif image.y_bake_info.is_baked:
+        removed_references.extend(clean_bake_info_object_references(image.y_bake_info, scene_object_names))
 
-                for i in reversed(indices):
-                    segment.bake_info.selected_objects.remove(i)
+    for r in removed_references:
+        print('Reference for', r, "is removed because it's no longer found!")
 
-                # Check if other objects data are still accessible on any view layers
-                indices = []
-                for i, o in enumerate(segment.bake_info.other_objects):
-                    if o.object:
-                        if is_greater_than_280():
-                            if not any([s for s in bpy.data.scenes if o.object.name in s.collection.all_objects]):
-                                removed_references.append(o.object.name)
-                                indices.append(i)
-                        else:
-                            if not any([s for s in bpy.data.scenes if o.object.name in s.objects]):
-                                removed_references.append(o.object.name)
-                                indices.append(i)
+def get_png_pixels(image):
+    # Convert float pixels to 8-bit right after reading, so only one float buffer is alive at a time
+    pxs = numpy.empty(shape=image.size[0]*image.size[1]*4, dtype=numpy.float32)
+    image.pixels.foreach_get(pxs)
+    pxs *= 255.0
+    numpy.rint(pxs, out=pxs)
+    numpy.clip(pxs, 0, 255, out=pxs)
+
+    return pxs.astype(numpy.uint8)
+
+def encode_png(arr, width, height, compression=6):
+    # PNG rows go from top to bottom
+    arr = arr.reshape(height, width * 4)[::-1]
+
+    # Every row starts with filter type 0 (None)
+    raw = numpy.zeros(shape=(height, width * 4 + 1), dtype=numpy.uint8)
+    raw[:, 1:] = arr
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+    # 8-bit RGBA
+    ihdr = struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)
+
+    return b''.join([
+        b'\x89PNG\r\n\x1a\n',
+        chunk(b'IHDR', ihdr),
+        chunk(b'IDAT', zlib.compress(raw.tobytes(), compression)),
+        chunk(b'IEND', b''),
+        ])
+
+def is_parallel_save_supported(image):
+    if not is_greater_than_280(): return False
+    if image.source not in {'FILE', 'GENERATED'}: return False
+    if image.is_float or image.channels != 4: return False
+    if image.size[0] == 0 or image.size[1] == 0: return False
+
+    # Packed or generated image will always be packed as PNG
+    if image.packed_file or image.filepath == '':
+        return image.packed_file == None or image.file_format == 'PNG'
+
+    return image.file_format == 'PNG' and bpy.path.abspath(image.filepath).lower().endswith('.png')
+
+def save_pack_images_parallel(images):
+    T = time.time()
+
+    max_workers = os.cpu_count() or 1
+
+    def encode_job(job):
+        image, arr, width, height, pack, path = job
+        data = encode_png(arr, width, height)
+        if not pack:
+            with open(path, 'wb') as f:
+                f.write(data)
+        return data
+
+    failed_images = []
+
+    def attach_result(job, future):
+        image, arr, width, height, pack, path = job
+        try: data = future.result()
+        except Exception as e:
+            print('WARNING: Saving', image.name, 'on worker thread failed!', e)
+            failed_images.append(image)
+            return
+
+        if pack:
+            image.pack(data=data, data_len=len(data))
+
+            # Packing generated image from memory also turns it into file image
+            if image.source == 'GENERATED':
+                image.source = 'FILE'
 
-                for i in reversed(indices):
-                    segment.bake_info.other_objects.remove(i)
+            print('INFO:', image.name, 'image is packed on worker thread')
+        else:
+            print('INFO:', image.name, 'image is saved on worker thread')
 
-    elif image.y_bake_info.is_baked:
+        # Reload to clear dirty flag
+        image.reload()
 
-        if image.y_bake_info.is_baked:
+    # Encode and write images using worker threads, zlib releases the GIL while compressing
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        queue = list(images)
+        pending = {}
 
-            # Check if selected objects data are still accessible on any view layers
-            indices = []
-            for i, o in enumerate(image.y_bake_info.selected_objects):
-                if o.object:
-                    if is_greater_than_280():
-                        if not any([s for s in bpy.data.scenes if o.object.name in s.collection.all_objects]):
-                            removed_references.append(o.object.name)
-                            indices.append(i)
-                    else:
-                        if not any([s for s in bpy.data.scenes if o.object.name in s.objects]):
-                            removed_references.append(o.object.name)
-                            indices.append(i)
-            for i in reversed(indices):
-                image.y_bake_info.selected_objects.remove(i)
-
-            # Check if other objects data are still accessible on any view layers
-            indices = []
-            for i, o in enumerate(image.y_bake_info.other_objects):
-                if o.object:
-                    if is_greater_than_280():
-                        if not any([s for s in bpy.data.scenes if o.object.name in s.collection.all_objects]):
-                            removed_references.append(o.object.name)
-                            indices.append(i)
-                    else:
-                        if not any([s for s in bpy.data.scenes if o.object.name in s.objects]):
-                            removed_references.append(o.object.name)
-                            indices.append(i)
-            for i in reversed(indices):
-                image.y_bake_info.other_objects.remove(i)
+        while queue or pending:
 
-    for r in removed_references:
-        print('Reference for', r, "is removed because it's no longer found!")
+            # Only read pixels of the next image when a worker is free, so memory usage stays bounded
+            while queue and len(pending) < max_workers:
+                image = queue.pop(0)
+                pack = image.packed_file != None or image.filepath == ''
+                path = '' if pack else bpy.path.abspath(image.filepath)
+                job = (image, get_png_pixels(image), image.size[0], image.size[1], pack, path)
+                pending[executor.submit(encode_job, job)] = job
 
-def save_pack_all(yp, only_dirty = True):
+            # Attach the results back on main thread
+            done, not_done = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                attach_result(pending.pop(future), future)
+
+    print('INFO:', len(images), 'image(s) are saved/packed in parallel at', '{:0.2f}'.format((time.time() - T) * 1000), 'ms!')
+
+    return failed_images
+
+def get_yp_save_images(yp):
 
     tree = yp.id_data
 
-    images = []
+    # Use dictionary to avoid linear search when checking duplicates
+    images = {}
+
+    def add_image(image):
+        if image and image.name not in images:
+            images[image.name] = image
+
     for layer in yp.layers:
         
         # Layer image
         if layer.type == 'IMAGE':
             source = get_layer_source(layer)
-            if source.image and source.image not in images:
-                images.append(source.image)
+            add_image(source.image)
 
         # Mask image
         for mask in layer.masks:
             if mask.type == 'IMAGE':
                 mask_tree = get_mask_tree(mask)
                 source = mask_tree.nodes.get(mask.source)
-                if source.image and source.image not in images:
-                    images.append(source.image)
+                add_image(source.image)
 
         # Channel override image
         for ch in layer.channels:
 
             if ch.override and ch.override_type == 'IMAGE':
                 source = get_channel_source(ch, layer)
-                if source.image and source.image not in images:
-                    images.append(source.image)
+                add_image(source.image)
 
             if ch.override_1 and ch.override_1_type == 'IMAGE':
                 source = get_channel_source_1(ch, layer)
-                if source.image and source.image not in images:
-                    images.append(source.image)
+                add_image(source.image)
 
     # Baked images
     for ch in yp.channels:
         baked = tree.nodes.get(ch.baked)
-        if baked and baked.image and baked.image not in images:
-            images.append(baked.image)
+        if baked: add_image(baked.image)
 
         if ch.type == 'NORMAL':
             baked_disp = tree.nodes.get(ch.baked_disp)
-            if baked_disp and baked_disp.image and baked_disp.image not in images:
-                images.append(baked_disp.image)
+            if baked_disp: add_image(baked_disp.image)
 
             if not is_overlay_normal_empty(yp):
                 baked_normal_overlay = tree.nodes.get(ch.baked_normal_overlay)
-                if baked_normal_overlay and baked_normal_overlay.image and baked_normal_overlay.image not in images:
-                    images.append(baked_normal_overlay.image)
+                if baked_normal_overlay: add_image(baked_normal_overlay.image)
 
-    packed_float_images = []
+    return list(images.values())
 
-    #print()
-    # Temporary scene for blender 3.30 hack
-    tmpscene = None
-    if is_greater_than_330():
-        tmpscene = bpy.data.scenes.new('Temp Save Scene')
-        tmpscene.view_settings.view_transform = 'Standard'
-        tmpscene.render.image_settings.file_format = 'PNG'
+def save_pack_image(image, tmpscene, packed_float_images):
+    T = time.time()
+    if image.packed_file or image.filepath == '':
+        if is_greater_than_280():
+            image.pack()
+        else:
+            if image.is_float:
+                pack_float_image(image)
+                packed_float_images.append(image)
+            else: 
+                image.pack(as_png=True)
 
-    # Save/pack images
-    for image in images:
-        clean_object_references(image)
-        if not image: continue
-        if only_dirty and not image.is_dirty: continue
-        T = time.time()
-        if image.packed_file or image.filepath == '':
-            if is_greater_than_280():
+        print('INFO:', image.name, 'image is packed at', '{:0.2f}'.format((time.time() - T) * 1000), 'ms!')
+    else:
+        if image.is_float:
+            save_float_image(image)
+        else:
+            # BLENDER BUG: Blender 3.3 has wrong srgb if not packed first
+            if is_greater_than_330() and image.colorspace_settings.name in {'Linear', 'Non-Color'}:
+
+                # Get image path
+                path = bpy.path.abspath(image.filepath)
+
+                # Pack image first
                 image.pack()
-            else:
-                if image.is_float:
-                    pack_float_image(image)
-                    packed_float_images.append(image)
-                else: 
-                    image.pack(as_png=True)
+                image.colorspace_settings.name = 'sRGB'
+
+                # Remove old files to avoid caching (?)
+                try: os.remove(path)
+                except Exception as e: print(e)
+                
+                # Then unpack
+                default_dir, default_dir_found, default_filepath, temp_path, unpacked_path = unpack_image(image, path)
+
+                # Save image
+                image.save_render(path, scene=tmpscene)
+
+                # Set the filepath to the image
+                try: image.filepath = bpy.path.relpath(path)
+                except: image.filepath = path
+
+                # Bring back linear
+                image.colorspace_settings.name = 'Non-Color'
+
+                # Remove unpacked images on Blender 3.3 
+                remove_unpacked_image_path(image, path, default_dir, default_dir_found, default_filepath, temp_path, unpacked_path)
+
+                print('INFO:', image.name, 'image is saved at', '{:0.2f}'.format((time.time() - T) * 1000), 'ms!')
 
-            print('INFO:', image.name, 'image is packed at', '{:0.2f}'.format((time.time() - T) * 1000), 'ms!')
-        else:
-            if image.is_float:
-                save_float_image(image)
             else:
-                # BLENDER BUG: Blender 3.3 has wrong srgb if not packed first
-                if is_greater_than_330() and image.colorspace_settings.name in {'Linear', 'Non-Color'}:
+                ori_colorspace = image.colorspace_settings.name
+                image.save()
+                image.colorspace_settings.name = ori_colorspace
 
-                    # Get image path
-                    path = bpy.path.abspath(image.filepath)
+                print('INFO:', image.name, 'image is saved at', '{:0.2f}'.format((time.time() - T) * 1000), 'ms!')
 
-                    # Pack image first
-                    image.pack()
-                    image.colorspace_settings.name = 'sRGB'
+def save_pack_all(yp, only_dirty = True):
 
-                    # Remove old files to avoid caching (?)
-                    try: os.remove(path)
-                    except Exception as e: print(e)
-                    
-                    # Then unpack
-                    default_dir, default_dir_found, default_filepath, temp_path, unpacked_path = unpack_image(image, path)
+    images = get_yp_save_images(yp)
 
-                    # Save image
-                    image.save_render(path, scene=tmpscene)
+    # Skip clean images early so their bake info references won't be scanned
+    if only_dirty:
+        images = [image for image in images if image.is_dirty]
 
-                    # Set the filepath to the image
-                    try: image.filepath = bpy.path.relpath(path)
-                    except: image.filepath = path
+    if not images: return []
 
-                    # Bring back linear
-                    image.colorspace_settings.name = 'Non-Color'
+    packed_float_images = []
 
-                    # Remove unpacked images on Blender 3.3 
-                    remove_unpacked_image_path(image, path, default_dir, default_dir_found, default_filepath, temp_path, unpacked_path)
+    #print()
+    # Temporary scene for blender 3.30 hack
+    tmpscene = None
+    if is_greater_than_330() and any(not img.packed_file and img.filepath != '' and not img.is_float and img.colorspace_settings.name in {'Linear', 'Non-Color'} for img in images):
+        tmpscene = bpy.data.scenes.new('Temp Save Scene')
+        tmpscene.view_settings.view_transform = 'Standard'
+        tmpscene.render.image_settings.file_format = 'PNG'
 
-                    print('INFO:', image.name, 'image is saved at', '{:0.2f}'.format((time.time() - T) * 1000), 'ms!')
+    # Collect scene objects once for all images
+    scene_object_names = get_scene_object_names()
 
-                else:
-                    try:
-                        ori_colorspace = image.colorspace_settings.name
-                        image.save()
-                        image.colorspace_settings.name = ori_colorspace
+    # Images that can be encoded in parallel
+    parallel_images = []
+    ypup = get_user_preferences()
+    if ypup.parallel_save_images:
+        for image in images:
+            if is_parallel_save_supported(image):
+                clean_object_references(image, scene_object_names)
+                parallel_images.append(image)
+
+        if parallel_images:
+            failed_images = save_pack_images_parallel(parallel_images)
+            parallel_images = [image for image in parallel_images if image not in failed_images]
 
-                        print('INFO:', image.name, 'image is saved at', '{:0.2f}'.format((time.time() - T) * 1000), 'ms!')
-                    except Exception as e:
-                        print(e)
+    # Save/pack images, images failed to be saved in parallel will use this too
+    failed_images = []
+    for image in images:
+        if image in parallel_images: continue
+        clean_object_references(image, scene_object_names)
+        try: save_pack_image(image, tmpscene, packed_float_images)
+        except Exception as e:
+            print('WARNING: Saving', image.name, 'failed!', e)
+            failed_images.append(image)
 
     # Delete temporary scene
     if tmpscene:
@@ -302,6 +402,8 @@ def save_pack_all(yp, only_dirty = True):
                 ypui = bpy.context.window_manager.ypui
                 ypui.refresh_image_hack = True
 
+    return failed_images
+
 class YInvertImage(bpy.types.Operator):
     """Invert Image"""
     bl_idname = "node.y_invert_image"
@@ -1084,9 +1186,11 @@ class YSavePackAll(bpy.types.Operator):
         ypui = bpy.context.window_manager.ypui
         #T = time.time()
         yp = get_active_ypaint_node().node_tree.yp
-        save_pack_all(yp, only_dirty=False)
+        failed_images = save_pack_all(yp, only_dirty=False)
         #print('INFO:', 'All images is saved/packed at', '{:0.2f}'.format((time.time() - T) * 1000), 'ms!')
         ypui.refresh_image_hack = False
+        if failed_images:
+            self.report({'ERROR'}, 'Failed to save/pack image(s): ' + ', '.join(image.name for image in failed_images))
         return {'FINISHED'}
 
 def register():
@@ -1,5 +1,6 @@
 import bpy, time
 from mathutils import *
+from bpy.app.handlers import persistent
 from .common import *
 
 NO_MODIFIER_Y_OFFSET = 200
@@ -581,10 +582,111 @@ def rearrange_transition_bump_nodes(tree, ch, loc):
 #    if loc.x < farthest_x: 
 #        loc.x = farthest_x
 
+# Trees that need to be arranged later, key is pointer of yp tree and value is set of layer tree pointers.
+# None on the set means the yp tree itself need to be arranged.
+# Pointers are used so renaming the tree or layers won't lose the dirty flags.
+_layout_dirty_trees = {}
+_layout_force_depth = [0]
+
+def is_lazy_node_arrangement():
+    if _layout_force_depth[0] > 0: return False
+    if bpy.app.background: return True
+    return get_user_preferences().lazy_node_arrangement
+
+# Node editor trees are checked on every rearrange call, so the result is reused for a short time
+NODE_EDITOR_TREES_CACHE_TIME = 0.5
+_node_editor_trees_cache = [0.0, set()]
+
+def get_node_editor_trees(use_cache=True):
+    if use_cache and time.time() - _node_editor_trees_cache[0] < NODE_EDITOR_TREES_CACHE_TIME:
+        return _node_editor_trees_cache[1]
+
+    trees = set()
+    wm = bpy.context.window_manager
+    if wm:
+        for window in wm.windows:
+            if not window.screen: continue
+            for area in window.screen.areas:
+                if area.type != 'NODE_EDITOR': continue
+                space = area.spaces.active
+                for path in space.path:
+                    if path.node_tree: trees.add(path.node_tree.name)
+
+    _node_editor_trees_cache[0] = time.time()
+    _node_editor_trees_cache[1] = trees
+
+    return trees
+
+def is_yp_tree_shown(group_tree, trees=None):
+    if trees == None: trees = get_node_editor_trees()
+
+    # Node editor path contains all parent trees, so layer tree that's opened from yp tree also has yp tree on the path
+    return group_tree.name in trees
+
+def mark_layout_dirty(group_tree, layer=None):
+    key = get_layer_update_key(layer) if layer else None
+    _layout_dirty_trees.setdefault(group_tree.as_pointer(), set()).add(key)
+
+    # Check the editors periodically, there's no need to do it on background mode since there's no editor
+    if not bpy.app.background and not bpy.app.timers.is_registered(check_layout_dirty_trees):
+        bpy.app.timers.register(check_layout_dirty_trees, first_interval=0.5)
+
+def arrange_dirty_tree(group_tree):
+    layer_keys = _layout_dirty_trees.pop(group_tree.as_pointer(), set())
+    if not layer_keys: return
+
+    T = time.time()
+    yp = group_tree.yp
+
+    _layout_force_depth[0] += 1
+    try:
+        for layer in yp.layers:
+            if get_layer_update_key(layer) in layer_keys:
+                rearrange_layer_nodes(layer)
+
+        if None in layer_keys:
+            rearrange_yp_nodes(group_tree)
+    finally:
+        _layout_force_depth[0] -= 1
+
+    print('INFO: Delayed node arrangement of', group_tree.name, 'is done at', '{:0.2f}'.format((time.time() - T) * 1000), 'ms!')
+
+def arrange_all_dirty_trees():
+    for pointer in list(_layout_dirty_trees.keys()):
+        group_tree = get_tree_by_pointer(pointer)
+        if group_tree: arrange_dirty_tree(group_tree)
+        else: _layout_dirty_trees.pop(pointer, None)
+
+def check_layout_dirty_trees():
+    trees = get_node_editor_trees(use_cache=False)
+
+    for pointer in list(_layout_dirty_trees.keys()):
+        group_tree = get_tree_by_pointer(pointer)
+        if not group_tree:
+            _layout_dirty_trees.pop(pointer)
+        elif is_yp_tree_shown(group_tree, trees):
+            arrange_dirty_tree(group_tree)
+
+    if not _layout_dirty_trees: return None
+    return 0.5
+
+@persistent
+def ypaint_arrange_dirty_trees_on_save(scene):
+    # Dirty flags only live on runtime, so unarranged trees should be arranged before saved to file
+    # This is also needed on background mode since node arrangements are always delayed there
+    if not _layout_dirty_trees: return
+    arrange_all_dirty_trees()
+
 def rearrange_layer_nodes(layer, tree=None):
     yp = layer.id_data.yp
 
     if yp.halt_reconnect: return
+    if not tree and defer_tree_update(layer.id_data, 'REARRANGE_LAYER', layer): return
+
+    # Arrange later when the tree is shown on node editor
+    if not tree and is_lazy_node_arrangement() and not is_yp_tree_shown(layer.id_data):
+        mark_layout_dirty(layer.id_data, layer)
+        return
 
     if not tree: tree = get_tree(layer)
     nodes = tree.nodes
@@ -1673,6 +1775,12 @@ def rearrange_depth_layer_nodes(group_tree):
     check_set_node_loc(tree, TREE_END, loc)
 
 def rearrange_yp_nodes(group_tree):
+    if defer_tree_update(group_tree, 'REARRANGE_YP'): return
+
+    # Arrange later when the tree is shown on node editor
+    if is_lazy_node_arrangement() and not is_yp_tree_shown(group_tree):
+        mark_layout_dirty(group_tree)
+        return
 
     yp = group_tree.yp
     nodes = group_tree.nodes
@@ -1,14 +1,108 @@
 import bpy
 from .common import *
 
+# Link diffs of trees being reconnected, key is pointer of the tree.
+# Accessing socket links needs to scan all tree links, so existing links are indexed once per reconnect.
+# Link functions only edit the desired links while the diff is open,
+# then only links that are actually different will be added or removed when the diff ends.
+# NOTE: Links of the tree should only be changed using link functions while the diff is open
+_link_caches = {}
+
+def build_link_cache(tree, cache):
+    cache['existing'] = {}
+    cache['links'] = {}
+    cache['to'] = {}
+    cache['from'] = {}
+    for link in tree.links:
+        key = (link.from_socket.as_pointer(), link.to_socket.as_pointer())
+        cache['existing'][key] = link
+        add_link_to_cache(cache, key, link)
+
+def add_link_to_cache(cache, key, link):
+    # Value is the existing link or a pair of sockets for the link that will be created
+    cache['links'][key] = link
+    cache['to'].setdefault(key[1], set()).add(key)
+    cache['from'].setdefault(key[0], set()).add(key)
+
+def remove_link_from_cache(cache, key):
+    cache['links'].pop(key, None)
+    cache['from'].get(key[0], set()).discard(key)
+    cache['to'].get(key[1], set()).discard(key)
+
+def begin_link_diff(tree):
+    cache = _link_caches.get(tree.as_pointer())
+    if cache:
+        cache['depth'] += 1
+        return
+
+    cache = _link_caches[tree.as_pointer()] = {'depth' : 1, 'time' : time.time()}
+    build_link_cache(tree, cache)
+
+def end_link_diff(tree, label=''):
+    cache = _link_caches.get(tree.as_pointer())
+    if not cache: return 0
+
+    cache['depth'] -= 1
+    if cache['depth'] > 0: return 0
+
+    _link_caches.pop(tree.as_pointer())
+
+    existing = cache['existing']
+    desired = cache['links']
+
+    # Remove links first so new links of single inputs won't replace them implicitly
+    removed = [k for k in existing if k not in desired]
+    for key in removed:
+        tree.links.remove(existing[key])
+
+    added = [k for k in desired if k not in existing]
+    for key in added:
+        out, inp = desired[key]
+        tree.links.new(out, inp)
+
+    mutations = len(removed) + len(added)
+
+    if get_user_preferences().developer_mode:
+        print('INFO: Reconnecting', label if label != '' else tree.name, 'is done with', mutations, 
+                'link mutation(s) at', '{:0.2f}'.format((time.time() - cache['time']) * 1000), 'ms!')
+
+    return mutations
+
+def get_link_cache(tree):
+    return _link_caches.get(tree.as_pointer())
+
 def create_link(tree, out, inp):
-    if not any(l for l in out.links if l.to_socket == inp):
+    cache = get_link_cache(tree)
+    if cache:
+        key = (out.as_pointer(), inp.as_pointer())
+        if key not in cache['links']:
+
+            # New link replaces previous link of the input
+            if not getattr(inp, 'is_multi_input', False):
+                for k in list(cache['to'].get(key[1], [])):
+                    remove_link_from_cache(cache, k)
+
+            # Link that is broken then created again in the same diff will keep the existing link
+            add_link_to_cache(cache, key, cache['existing'].get(key, (out, inp)))
+
+    elif not any(l for l in out.links if l.to_socket == inp):
         tree.links.new(out, inp)
         #print(out, 'is connected to', inp)
     if inp.node: return inp.node.outputs
     return None
 
+def remove_cached_links(cache, keys):
+    for key in list(keys):
+        remove_link_from_cache(cache, key)
+
 def break_link(tree, out, inp):
+    cache = get_link_cache(tree)
+    if cache:
+        key = (out.as_pointer(), inp.as_pointer())
+        if key not in cache['links']: return False
+        remove_cached_links(cache, [key])
+        return True
+
     for link in out.links:
         if link.to_socket == inp:
             tree.links.remove(link)
@@ -16,10 +110,20 @@ def break_link(tree, out, inp):
     return False
 
 def break_input_link(tree, inp):
+    cache = get_link_cache(tree)
+    if cache:
+        remove_cached_links(cache, cache['to'].get(inp.as_pointer(), []))
+        return
+
     for link in inp.links:
         tree.links.remove(link)
 
 def break_output_link(tree, outp):
+    cache = get_link_cache(tree)
+    if cache:
+        remove_cached_links(cache, cache['from'].get(outp.as_pointer(), []))
+        return
+
     for link in outp.links:
         tree.links.remove(link)
 
@@ -901,6 +1005,16 @@ def reconnect_depth_layer_nodes(group_tree, parallax_ch, parallax):
 
 #def reconnect_yp_nodes(tree, ch_idx=-1):
 def reconnect_yp_nodes(tree, merged_layer_ids = []):
+    # Merge wiring is needed right away for baking, so run pending updates first then connect immediately
+    if merged_layer_ids: flush_tree_update_batch(tree)
+    elif defer_tree_update(tree, 'RECONNECT_YP', args=(merged_layer_ids,)): return
+
+    # Only links that are different will be touched
+    begin_link_diff(tree)
+    try: actual_reconnect_yp_nodes(tree, merged_layer_ids)
+    finally: end_link_diff(tree)
+
+def actual_reconnect_yp_nodes(tree, merged_layer_ids = []):
     yp = tree.yp
     nodes = tree.nodes
 
@@ -1491,6 +1605,18 @@ def reconnect_layer_nodes(layer, ch_idx=-1, merge_mask=False):
 
     #print('Reconnect layer ' + layer.name)
     if yp.halt_reconnect: return
+    # Merge wiring is needed right away for baking, so run pending updates first then connect immediately
+    if merge_mask: flush_tree_update_batch(layer.id_data)
+    elif defer_tree_update(layer.id_data, 'RECONNECT_LAYER', layer, (ch_idx, merge_mask)): return
+
+    # Only links that are different will be touched
+    tree = get_tree(layer)
+    begin_link_diff(tree)
+    try: actual_reconnect_layer_nodes(layer, ch_idx, merge_mask)
+    finally: end_link_diff(tree, layer.name)
+
+def actual_reconnect_layer_nodes(layer, ch_idx=-1, merge_mask=False):
+    yp = layer.id_data.yp
 
     tree = get_tree(layer)
     nodes = tree.nodes
@@ -20,6 +20,11 @@ class YPaintPreferences(AddonPreferences):
                      ),
             default = 'ONLY_DIRTY')
 
+    parallel_save_images : BoolProperty(
+            name = 'Save/Pack Images in Parallel',
+            description = 'Encode 8-bit PNG images using multiple threads when saving/packing all images.\nOther image types will still be saved one by one (EXPERIMENTAL)',
+            default = False)
+
     default_new_image_size : IntProperty(
             name = 'Default New Image Size',
             description = 'Default new image size',
@@ -38,6 +43,28 @@ class YPaintPreferences(AddonPreferences):
             default = 2048,
             min=1024, max=4096)
 
+    udim_temp_compression : EnumProperty(
+            name = 'UDIM Temporary Files Compression',
+            description = 'PNG compression used for temporary 8-bit UDIM files when swapping, copying, or packing tiles.\nLower compression is faster but packed UDIM images will use more space',
+            items = (('DEFAULT', 'Default', 'Use default PNG compression'),
+                     ('FAST', 'Fast', 'Use low PNG compression'),
+                     ('NONE', 'None', 'Use no PNG compression'),
+                     ),
+            default = 'DEFAULT')
+
+    lazy_node_arrangement : BoolProperty(
+            name = 'Lazy Node Arrangement',
+            description = 'Only arrange nodes when the tree is shown in a node editor (always enabled in background mode)',
+            default = False)
+
+    blur_backend : EnumProperty(
+            name = 'Blur Backend',
+            description = 'Method used to blur baked images',
+            items = (('CYCLES', 'Cycles Bake', 'Blur by baking random offsets with Cycles'),
+                     ('NUMPY', 'Numpy', 'Deterministic separable blur computed on the pixels directly (faster)'),
+                     ),
+            default = 'CYCLES')
+
     unique_image_atlas_per_yp : BoolProperty(
             name = 'Use unique Image Atlas per ' + get_addon_title() + ' tree',
             description = 'Try to use different image atlas per ' + get_addon_title() + ' tree',
@@ -103,10 +130,14 @@ class YPaintPreferences(AddonPreferences):
 
     def draw(self, context):
         self.layout.prop(self, 'auto_save')
+        self.layout.prop(self, 'parallel_save_images')
         self.layout.prop(self, 'default_new_image_size')
         self.layout.prop(self, 'image_atlas_size')
         self.layout.prop(self, 'hdr_image_atlas_size')
         self.layout.prop(self, 'unique_image_atlas_per_yp')
+        self.layout.prop(self, 'udim_temp_compression')
+        self.layout.prop(self, 'blur_backend')
+        self.layout.prop(self, 'lazy_node_arrangement')
         self.layout.prop(self, 'make_preview_mode_srgb')
         self.layout.prop(self, 'use_image_preview')
         self.layout.prop(self, 'show_experimental')
@@ -137,13 +168,25 @@ def auto_save_images(scene):
         ypup = bpy.context.preferences.addons[__package__].preferences
     else: ypup = bpy.context.user_preferences.addons[__package__].preferences
 
+    failed_images = []
     for tree in bpy.data.node_groups:
         if not hasattr(tree, 'yp'): continue
         if tree.yp.is_ypaint_node:
             if ypup.auto_save == 'ONLY_DIRTY':
-                image_ops.save_pack_all(tree.yp, only_dirty=True)
+                failed_images += image_ops.save_pack_all(tree.yp, only_dirty=True)
             elif ypup.auto_save == 'FORCE_ALL':
-                image_ops.save_pack_all(tree.yp, only_dirty=False)
+                failed_images += image_ops.save_pack_all(tree.yp, only_dirty=False)
+
+    # There's no operator to report from save handler, so show the failed images on a popup
+    if failed_images:
+        names = [image.name for image in failed_images]
+        print('ERROR: Failed to save/pack image(s):', ', '.join(names))
+        wm = bpy.context.window_manager
+        if not bpy.app.background and wm and len(wm.windows) > 0:
+            def draw(self, context):
+                for name in names:
+                    self.layout.label(text=name)
+            wm.popup_menu(draw, title='Failed to Save/Pack Images', icon='ERROR')
 
 # HACK: For some reason active float image will glitch after auto save
 # This hack will fix that
@@ -1,4 +1,4 @@
-import bpy, re
+import bpy, re, numpy
 from . import lib, Modifier, MaskModifier
 from .common import *
 from .node_arrangements import *
@@ -749,6 +749,41 @@ def recover_tangent_sign_process(ori_obj, ori_mode, ori_selects):
     if ori_mode != ori_obj.mode:
         bpy.ops.object.mode_set(mode=ori_mode)
 
+def get_uv_winding_signs(mesh, uv_layer):
+    # Bitangent sign follows the winding of the face on uv space,
+    # so it can be calculated from signed area of each polygon uvs
+    num_loops = len(mesh.loops)
+    num_polys = len(mesh.polygons)
+
+    uvs = numpy.empty(num_loops * 2, dtype=numpy.float32)
+    uv_layer.data.foreach_get('uv', uvs)
+    uvs.shape = (-1, 2)
+
+    loop_starts = numpy.empty(num_polys, dtype=numpy.int32)
+    loop_totals = numpy.empty(num_polys, dtype=numpy.int32)
+    mesh.polygons.foreach_get('loop_start', loop_starts)
+    mesh.polygons.foreach_get('loop_total', loop_totals)
+
+    # Index of the next loop in the same polygon
+    next_loops = numpy.arange(1, num_loops + 1)
+    next_loops[loop_starts + loop_totals - 1] = loop_starts
+
+    # Shoelace formula
+    cross = uvs[:, 0] * uvs[next_loops, 1] - uvs[next_loops, 0] * uvs[:, 1]
+    order = numpy.argsort(loop_starts)
+    areas = numpy.empty(num_polys, dtype=numpy.float32)
+    areas[order] = numpy.add.reduceat(cross, loop_starts[order]) if num_polys > 0 else []
+
+    poly_signs = numpy.where(areas >= 0.0, 1.0, -1.0).astype(numpy.float32)
+
+    # Spread polygon signs to its loops
+    poly_indices = numpy.repeat(numpy.arange(num_polys), loop_totals)
+    offsets = numpy.arange(num_loops) - numpy.repeat(numpy.cumsum(loop_totals) - loop_totals, loop_totals)
+    signs = numpy.empty(num_loops, dtype=numpy.float32)
+    signs[loop_starts[poly_indices] + offsets] = poly_signs[poly_indices]
+
+    return signs
+
 def actual_refresh_tangent_sign_vcol(obj, uv_name):
 
     if obj.type != 'MESH': return None
@@ -790,158 +825,29 @@ def actual_refresh_tangent_sign_vcol(obj, uv_name):
                 recover_tangent_sign_process(ori_obj, ori_mode, ori_selects)
                 return None
 
-            # Set default color to be white
-            if is_greater_than_280():
-                for d in vcol.data: 
-                    d.color = (1.0, 1.0, 1.0, 1.0)
-            else: 
-                for d in vcol.data: 
-                    d.color = (1.0, 1.0, 1.0)
-
         # Use try except because ngon can cause error 
         try:
             # Calc tangents
             obj.data.calc_tangents()
 
-            # Get vcol again after calculate tangent to prevent error
-            vcol = vcols.get(TANGENT_SIGN_PREFIX + uv_name)
-
-            # Set tangent sign to vertex color
-            i = 0
-            for poly in obj.data.polygons:
-                for idx in poly.loop_indices:
-                    vert = obj.data.loops[idx]
-                    bs = max(vert.bitangent_sign, 0.0)
-                    # Invert bitangent sign so the default value is 0.0 rather than 1.0
-                    bs = 1.0 - bs
-                    if is_greater_than_280():
-                        vcol.data[i].color = (bs, bs, bs, 1.0)
-                    else: vcol.data[i].color = (bs, bs, bs)
-                    i += 1
-
-        # If using ngon, need a temporary mesh
-        except:
-
-            # Remember selection
-            if is_greater_than_280():
-                ori_select = [o for o in bpy.context.view_layer.objects if o.select_get()]
-            else: ori_select = [o for o in bpy.context.scene.objects if o.select]
+            signs = numpy.empty(len(obj.data.loops), dtype=numpy.float32)
+            obj.data.loops.foreach_get('bitangent_sign', signs)
 
-            # If object has multi users, get all related objects
-            related_objs = []
-            if obj.data.users > 1:
-                for o in get_scene_objects():
-                    if o.data == obj.data and o != obj:
-                        related_objs.append(o)
-
-                # Make object data single user
-                obj.data = obj.data.copy()
+        # Calculate tangent signs from uv winding if using ngon
+        except:
+            signs = get_uv_winding_signs(obj.data, get_uv_layers(obj).get(uv_name))
 
-            temp_ob = obj.copy()
-            temp_ob.data = obj.data.copy()
-            temp_ob.name = '___TEMP__'
+        # Get vcol again after calculate tangent to prevent error
+        vcol = vcols.get(TANGENT_SIGN_PREFIX + uv_name)
 
-            if is_greater_than_280():
-                bpy.context.scene.collection.objects.link(temp_ob)
-                bpy.context.view_layer.objects.active = temp_ob
-            else: 
-                bpy.context.scene.objects.link(temp_ob)
-                bpy.context.scene.objects.active = temp_ob
-
-            # Triangulate ngon faces on temp object
-            bpy.ops.object.select_all(action='DESELECT')
-            bpy.ops.object.mode_set(mode='EDIT')
-            bpy.ops.mesh.reveal()
-            bpy.ops.mesh.select_all(action='DESELECT')
-            bpy.ops.mesh.select_mode(type="FACE")
-            bpy.ops.mesh.select_face_by_sides(number=4, type='GREATER')
-            bpy.ops.mesh.quads_convert_to_tris()
-            bpy.ops.mesh.tris_convert_to_quads()
-            bpy.ops.object.mode_set(mode='OBJECT')
-
-            # Remove all modifiers on temp object
-            for mod in temp_ob.modifiers:
-                bpy.ops.object.modifier_remove(modifier=mod.name)
+        # Invert bitangent sign so the default value is 0.0 rather than 1.0
+        bs = 1.0 - numpy.maximum(signs, 0.0)
 
-            # Calc tangents
-            temp_ob.data.calc_tangents()
-
-            # Set tangent sign to vertex color
-            tvcols = get_vertex_colors(temp_ob)
-            temp_vcol = tvcols.get(TANGENT_SIGN_PREFIX + uv_name)
-            i = 0
-            for poly in temp_ob.data.polygons:
-                for idx in poly.loop_indices:
-                    vert = temp_ob.data.loops[idx]
-                    bs = max(vert.bitangent_sign, 0.0)
-                    # Invert bitangent sign so the default value is 0.0 rather than 1.0
-                    bs = 1.0 - bs
-                    if is_greater_than_280():
-                        temp_vcol.data[i].color = (bs, bs, bs, 1.0)
-                    else: temp_vcol.data[i].color = (bs, bs, bs)
-                    i += 1
-
-            # Set active object back to the original mesh
-            if is_greater_than_280():
-                bpy.context.view_layer.objects.active = obj
-            else: bpy.context.scene.objects.active = obj
-
-            # Number of original modifiers
-            num_mods = len(obj.modifiers)
-
-            # Remember original enabled modifiers
-            ori_show_render_mods = []
-            ori_show_viewport_mods = []
-            for m in obj.modifiers:
-                ori_show_viewport_mods.append(m.show_viewport)
-                ori_show_render_mods.append(m.show_render)
-                m.show_viewport = False
-                m.show_render = False
-            
-            # Add data transfer to original object
-            mod_name = 'Transferz'
-            mod = obj.modifiers.new(mod_name, 'DATA_TRANSFER')
-
-            # Move data transfer modifier to the top
-            #for i in range(len(obj.modifiers)-1):
-            for i in range(num_mods):
-                bpy.ops.object.modifier_move_up(modifier=mod_name)
-                
-            # Set transfer object
-            mod.object = temp_ob
-            mod.use_loop_data = True
-            mod.data_types_loops = {'VCOL'}
-            
-            # Apply modifier
-            bpy.ops.object.modifier_apply(modifier=mod_name)
-
-            # Recover original enabled modifiers
-            for i, m in enumerate(obj.modifiers):
-                if ori_show_viewport_mods[i]:
-                    m.show_viewport = ori_show_viewport_mods[i]
-                if ori_show_render_mods[i]:
-                    m.show_render = ori_show_render_mods[i]
-
-            # Delete temp object
-            temp_me = temp_ob.data
-            bpy.data.objects.remove(temp_ob)
-            bpy.data.meshes.remove(temp_me)
-
-            # Set back original select
-            for o in ori_select:
-                if is_greater_than_280():
-                    o.select_set(True)
-                else: o.select = True
-
-            # Bring object data to related objects
-            if related_objs:
-                ori_mesh = related_objs[0].data
-                ori_name = ori_mesh.name
-                for o in related_objs:
-                    o.data = obj.data
-
-                bpy.data.meshes.remove(ori_mesh)
-                o.data.name = ori_name
+        # Set tangent sign to vertex color
+        num_channels = 4 if is_greater_than_280() else 3
+        colors = numpy.ones((len(bs), num_channels), dtype=numpy.float32)
+        colors[:, :3] = bs[:, None]
+        vcol.data.foreach_set('color', colors.ravel())
 
         # Recover active uv
         set_active_uv_layer(obj, ori_layer_name)
@@ -3519,6 +3519,7 @@ class YPaintSpecialMenu(bpy.types.Menu):
         col.separator()
 
         col.operator('node.y_clean_yp_caches', icon_value=lib.get_icon('clean'))
+        col.operator('node.y_arrange_yp_nodes', icon='NODETREE')
 
         col.separator()
 
@@ -3861,6 +3862,9 @@ class YLayerListSpecialMenu(bpy.types.Menu):
             if context.image.yia.is_image_atlas or context.image.yua.is_udim_atlas:
                 col.operator("node.y_convert_to_standard_image", icon='IMAGE_DATA', text='Convert to standard Image').all_images = False
                 col.operator("node.y_convert_to_standard_image", icon='IMAGE_DATA', text='Convert All Image Atlas to standard Images').all_images = True
+                if context.image.yia.is_image_atlas:
+                    col.operator("node.y_compact_image_atlas", icon='IMAGE_DATA', text='Compact Image Atlas').all_atlases = False
+                    col.operator("node.y_compact_image_atlas", icon='IMAGE_DATA', text='Compact All Image Atlases').all_atlases = True
             else:
                 col.operator("node.y_convert_to_image_atlas", icon='IMAGE_DATA', text='Convert to Image Atlas').all_images = False
                 col.operator("node.y_convert_to_image_atlas", icon='IMAGE_DATA', text='Convert All Images to Image Atlas').all_images = True